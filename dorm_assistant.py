@@ -1,9 +1,42 @@
 import json
 import os
-import subprocess
+import copy
+import re
+import heapq
+import bisect
+import sys
+import queue
 import datetime
+import threading
+import time
+import contextlib
+import itertools
+from collections import OrderedDict
 
 DATA_FILE = "dorm_data.json"
+BINARY_DATA_FILE = "dorm_data.bin"
+JOURNAL_FILE = "dorm_data.journal"
+SUMMARY_FILE = "dorm_summary.json"
+SUMMARY_UPCOMING = 10
+JOURNAL_COMPACT_BYTES = 64 * 1024
+AUTOSAVE_DELAY = 2.0
+HALL_CAPACITY = 256
+DUTY_PERIOD = 7
+STATS_FILE = "dorm_stats.json"
+PROFILE_FILE = "dorm_profile.prof"
+GIT_CALL_HISTORY = 50
+REMINDER_LEADS = (7, 1, 0)
+REMINDER_HOUR = 9
+REMINDER_MAX_SLEEP = 3600
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_BY = "month"
+COMMIT_WINDOW = 6 * 3600
+SYNC_DEPTH = 50
+SQUASH_KEEP_DAYS = 30
+WATCH_INTERVAL = 1.0
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+DATE_PREFIX = re.compile(r"\d[\d-]{0,9}$")
 
 DEFAULT_DATA = {
     "config": {
@@ -14,97 +47,1661 @@ DEFAULT_DATA = {
     "shopping": {}
 }
 
-class DormHelper:
+class TextIndex:
     def __init__(self):
-        self.data = self.load_data()
+        self._texts = {}
+        self._grams = {}
+
+    def _grams_of(self, text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, key, text):
+        text = text.casefold()
+        self._texts[key] = text
+        grams = self._grams
+        for gram in self._grams_of(text):
+            keys = grams.get(gram)
+            if keys is None:
+                grams[gram] = {key}
+            else:
+                keys.add(key)
+
+    def remove(self, key):
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        for gram in self._grams_of(text):
+            keys = self._grams[gram]
+            keys.discard(key)
+            if not keys:
+                del self._grams[gram]
+
+    def find(self, term):
+        if len(term) == 3:
+            return self._grams.get(term, set())
+        postings = sorted((self._grams.get(term[i:i + 3], ()) for i in range(len(term) - 2)), key=len)
+        if not postings[0]:
+            return set()
+        keys = set(postings[0]).intersection(*postings[1:])
+        return {key for key in keys if term in self._texts[key]}
+
+
+class DeadlineIndex:
+    def __init__(self, ddls=()):
+        self._records = sorted(ddls, key=self._key)
+        self._keys = [self._key(ddl) for ddl in self._records]
+        self._by_id = {ddl["id"]: ddl for ddl in self._records}
+        self._titles = None
+        self._titles_lock = threading.Lock()
+        self._changes = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __getitem__(self, pos):
+        return self._records[pos]
+
+    def _key(self, ddl):
+        return (ddl["date"], ddl["id"])
+
+    def add(self, ddl):
+        key = self._key(ddl)
+        pos = bisect.bisect_right(self._keys, key)
+        self._keys.insert(pos, key)
+        self._records.insert(pos, ddl)
+        self._by_id[ddl["id"]] = ddl
+        with self._titles_lock:
+            self._changes += 1
+            if self._titles is not None:
+                self._titles.add(ddl["id"], ddl["title"])
+
+    def remove(self, ddl):
+        key = self._key(ddl)
+        pos = bisect.bisect_left(self._keys, key)
+        while pos < len(self._keys) and self._keys[pos] == key:
+            if self._records[pos] is ddl:
+                del self._keys[pos]
+                del self._records[pos]
+                if self._by_id.get(ddl["id"]) is ddl:
+                    del self._by_id[ddl["id"]]
+                    with self._titles_lock:
+                        self._changes += 1
+                        if self._titles is not None:
+                            self._titles.remove(ddl["id"])
+                return True
+            pos += 1
+        return False
+
+    def get(self, ddl_id):
+        return self._by_id.get(ddl_id)
+
+    def upcoming(self, k, today=None):
+        if today is None:
+            today = datetime.date.today().isoformat()
+        start = bisect.bisect_left(self._keys, (today,))
+        return self._records[start:start + k]
+
+    def between(self, start_date, end_date):
+        lo = bisect.bisect_left(self._keys, (start_date,))
+        hi = bisect.bisect_left(self._keys, (end_date + "\uffff",))
+        return self._records[lo:hi]
+
+    def _build_titles(self):
+        while self._titles is None:
+            changes = self._changes
+            titles = TextIndex()
+            for ddl in list(self._records):
+                titles.add(ddl["id"], ddl["title"])
+            with self._titles_lock:
+                if self._titles is None and changes == self._changes:
+                    self._titles = titles
+        return self._titles
+
+    def warm(self):
+        if self._titles is None:
+            threading.Thread(target=self._build_titles, daemon=True).start()
+
+    def search(self, query, limit=None):
+        terms = query.casefold().split()
+        if not terms:
+            return self._records[:limit] if limit else list(self._records)
+        short = [(term, bool(DATE_PREFIX.match(term))) for term in terms if len(term) < 3]
+        matches = None
+        for term in sorted((term for term in terms if len(term) >= 3), key=len, reverse=True):
+            ids = (self._titles or self._build_titles()).find(term)
+            if DATE_PREFIX.match(term):
+                ids = ids | {ddl["id"] for ddl in self.between(term, term)}
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return []
+        if matches is not None and len(matches) * 8 <= len(self._records):
+            records = [self._by_id[ddl_id] for ddl_id in matches]
+            if short:
+                records = [ddl for ddl in records if self._has_terms(ddl, short)]
+            if limit:
+                return heapq.nsmallest(limit, records, key=self._key)
+            return sorted(records, key=self._key)
+        result = []
+        for ddl in self._records:
+            if matches is not None and ddl["id"] not in matches:
+                continue
+            if short and not self._has_terms(ddl, short):
+                continue
+            result.append(ddl)
+            if limit and len(result) >= limit:
+                break
+        return result
+
+    def _has_terms(self, ddl, terms):
+        title = ddl["title"].casefold()
+        return all(term in title or (is_date and ddl["date"].startswith(term)) for term, is_date in terms)
+
+
+def _parse_date(date_str):
+    try:
+        return datetime.date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        return datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+
+
+def _archive_text(ddls):
+    records = sorted(ddls, key=lambda ddl: (ddl["date"], ddl["id"]))
+    return "[\n" + ",\n".join(json.dumps(ddl, ensure_ascii=False) for ddl in records) + "\n]\n"
+
+
+class DeadlineArchive:
+    def __init__(self, path):
+        self.path = path
+        self._periods = {}
+        self._index = None
+
+    def periods(self):
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+    def file(self, period):
+        return os.path.join(self.path, period + ".json")
+
+    def load(self, period):
+        ddls = self._periods.get(period)
+        if ddls is None:
+            try:
+                with open(self.file(period), "r", encoding="utf-8") as f:
+                    ddls = json.load(f)
+            except (OSError, ValueError):
+                ddls = []
+            self._periods[period] = ddls
+        return ddls
+
+    def loaded(self):
+        return sorted(self._periods)
+
+    def between(self, start_date, end_date):
+        ddls = {}
+        for period in self.periods():
+            if start_date[:len(period)] <= period <= end_date[:len(period)]:
+                for ddl in self.load(period):
+                    if start_date <= ddl["date"] <= end_date + "\uffff":
+                        ddls[ddl["id"]] = ddl
+        return sorted(ddls.values(), key=lambda ddl: (ddl["date"], ddl["id"]))
+
+    def index(self):
+        if self._index is None:
+            ddls = {}
+            for period in self.periods():
+                for ddl in self.load(period):
+                    ddls[ddl["id"]] = ddl
+            self._index = DeadlineIndex(ddls.values())
+        return self._index
+
+    def search(self, query, limit=None):
+        return self.index().search(query, limit)
+
+    def store(self, ddls, by=ARCHIVE_BY):
+        groups = {}
+        periods = {}
+        for ddl in ddls:
+            period = periods.get(ddl["date"])
+            if period is None:
+                date = _parse_date(ddl["date"])
+                period = periods[ddl["date"]] = f"{date.year:04d}" if by == "year" else f"{date.year:04d}-{date.month:02d}"
+            groups.setdefault(period, []).append(ddl)
+        os.makedirs(self.path, exist_ok=True)
+        for period, group in groups.items():
+            merged = {ddl["id"]: ddl for ddl in self.load(period)}
+            merged.update((ddl["id"], ddl) for ddl in group)
+            records = sorted(merged.values(), key=lambda ddl: (ddl["date"], ddl["id"]))
+            path = self.file(period)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(_archive_text(records))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            self._periods[period] = records
+        self._index = None
+        return sorted(groups)
+
+
+class DutySchedule:
+    def __init__(self, data):
+        self.data = data
+
+    def _date(self, date):
+        if date is None:
+            return datetime.date.today()
+        if isinstance(date, str):
+            return datetime.date.fromisoformat(date)
+        return date
+
+    def slot(self, date=None):
+        duty = self.data["duty"]
+        anchor = datetime.date.fromisoformat(duty["anchor"])
+        return (self._date(date) - anchor).days // duty["period"]
+
+    def slot_start(self, slot):
+        duty = self.data["duty"]
+        anchor = datetime.date.fromisoformat(duty["anchor"])
+        return (anchor + datetime.timedelta(days=slot * duty["period"])).isoformat()
+
+    def scheduled(self, slot):
+        roster = self.data["roster"]
+        if not roster:
+            return None
+        return roster[(slot + self.data["duty"]["offset"]) % len(roster)]
+
+    def at_slot(self, slot):
+        overrides = self.data["duty"].get("overrides", {})
+        start = self.slot_start(slot)
+        if start in overrides:
+            return overrides[start]
+        return self.scheduled(slot)
+
+    def on_duty(self, date=None):
+        if not self.data["roster"]:
+            return None
+        return self.at_slot(self.slot(date))
+
+    def upcoming(self, n, date=None):
+        first = self.slot(date)
+        return [(self.slot_start(slot), self.at_slot(slot)) for slot in range(first, first + n)]
+
+
+class ReminderScheduler:
+    def __init__(self, leads=REMINDER_LEADS, hour=REMINDER_HOUR, on_change=None, fired=0.0):
+        self.leads = sorted(set(leads), reverse=True)
+        self.hour = hour
+        self.on_change = on_change
+        self.fired = fired
+        self.heap = []
+        self.versions = {}
+        self.seq = 0
+        self._cache = {}
+
+    def _triggers(self, ddl, today):
+        key = (ddl["date"], today)
+        triggers = self._cache.get(key)
+        if triggers is None:
+            triggers = self._cache[key] = []
+            try:
+                date = datetime.date.fromisoformat(ddl["date"])
+            except (TypeError, ValueError):
+                return triggers
+            for lead in self.leads:
+                day = date - datetime.timedelta(days=lead)
+                if day >= today:
+                    when = datetime.datetime.combine(day, datetime.time(self.hour)).timestamp()
+                    triggers.append((when, lead))
+        return triggers
+
+    def _entries(self, ddl, today):
+        version = self.versions.get(ddl["id"], 0) + 1
+        self.versions[ddl["id"]] = version
+        triggers = [(when, lead) for when, lead in self._triggers(ddl, today) if when > self.fired]
+        entries = [(when, self.seq + n, version, lead, ddl) for n, (when, lead) in enumerate(triggers, 1)]
+        self.seq += len(entries)
+        return entries
+
+    def reset(self, ddls, today=None):
+        today = today or datetime.date.today()
+        self.versions, self._cache, self.heap = {}, {}, []
+        for ddl in ddls:
+            self.heap.extend(self._entries(ddl, today))
+        heapq.heapify(self.heap)
+        self._changed()
+
+    def add(self, ddl, today=None):
+        first = self.next_due()
+        for entry in self._entries(ddl, today or datetime.date.today()):
+            heapq.heappush(self.heap, entry)
+        if self.heap and (first is None or self.heap[0][0] < first):
+            self._changed()
+
+    def remove(self, ddl):
+        self.versions[ddl["id"]] = self.versions.get(ddl["id"], 0) + 1
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def _drop_stale(self):
+        while self.heap and self.versions.get(self.heap[0][4]["id"]) != self.heap[0][2]:
+            heapq.heappop(self.heap)
+
+    def next_due(self):
+        self._drop_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now=None):
+        now = time.time() if now is None else now
+        due = []
+        while self.next_due() is not None and self.heap[0][0] <= now:
+            when, _, _, lead, ddl = heapq.heappop(self.heap)
+            due.append((ddl, lead))
+        self.fired = max(self.fired, now)
+        return due
+
+    def delay(self, now=None):
+        when = self.next_due()
+        if when is None:
+            return None
+        now = time.time() if now is None else now
+        return min(max(0.0, when - now), REMINDER_MAX_SLEEP)
+
+
+def reminder_text(ddl, lead):
+    if lead == 0:
+        return f"Due today: {ddl['title']}"
+    if lead == 1:
+        return f"Due tomorrow: {ddl['title']}"
+    return f"Due in {lead} days ({ddl['date']}): {ddl['title']}"
+
+
+class ReminderThread:
+    def __init__(self, helper, notify=print):
+        self.helper = helper
+        self.notify = notify
+        self.wake = threading.Event()
+        self.stopped = False
+        helper.enable_reminders(on_change=self.wake.set)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped:
+            with self.helper.lock:
+                due = self.helper.reminders.pop_due()
+                delay = self.helper.reminders.delay()
+            for ddl, lead in due:
+                self.notify(f"\n[reminder] {reminder_text(ddl, lead)}")
+            self.wake.wait(delay)
+            self.wake.clear()
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+
+
+class InotifyWatch:
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+
+    def __init__(self, path):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(os.path.dirname(os.path.abspath(path))), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        self.name = os.fsencode(os.path.basename(path))
+
+    def changed(self):
+        import struct
+        changed = False
+        while True:
+            try:
+                events = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            pos = 0
+            while pos + 16 <= len(events):
+                _, mask, _, length = struct.unpack_from("iIII", events, pos)
+                name = events[pos + 16:pos + 16 + length].rstrip(b"\0")
+                changed = changed or name == self.name or bool(mask & self.IN_Q_OVERFLOW)
+                pos += 16 + length
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    def __init__(self, path):
+        self.path = path
+        self.inotify = None
+        if sys.platform.startswith("linux"):
+            try:
+                self.inotify = InotifyWatch(path)
+            except (OSError, AttributeError):
+                self.inotify = None
+
+    def pending(self):
+        return self.inotify.changed() if self.inotify else True
+
+    def close(self):
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ops = {}
+        self.counters = {}
+        self.git_calls = []
+
+    def record(self, name, ms):
+        with self.lock:
+            op = self.ops.get(name)
+            if op is None:
+                op = self.ops[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                       "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+            op["count"] += 1
+            op["total_ms"] += ms
+            op["max_ms"] = max(op["max_ms"], ms)
+            op["buckets"][bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def git(self, args, code, ms, error=""):
+        self.record(f"git {args[0]}", ms)
+        with self.lock:
+            self.counters[f"git exit {code}"] = self.counters.get(f"git exit {code}", 0) + 1
+            self.git_calls.append({"args": args, "code": code, "ms": ms, "error": error})
+            del self.git_calls[:-GIT_CALL_HISTORY]
+
+    def percentile(self, op, fraction):
+        target = op["count"] * fraction
+        seen = 0
+        for pos, count in enumerate(op["buckets"]):
+            seen += count
+            if seen >= target and count:
+                return min(LATENCY_BUCKETS_MS[pos], round(op["max_ms"], 3)) if pos < len(LATENCY_BUCKETS_MS) else round(op["max_ms"], 3)
+        return 0.0
+
+    def rows(self):
+        with self.lock:
+            ops = sorted(self.ops.items())
+        return [{
+            "name": name,
+            "count": op["count"],
+            "total_ms": round(op["total_ms"], 3),
+            "mean_ms": round(op["total_ms"] / op["count"], 3),
+            "p50_ms": self.percentile(op, 0.5),
+            "p95_ms": self.percentile(op, 0.95),
+            "max_ms": round(op["max_ms"], 3),
+        } for name, op in ops]
+
+    def snapshot(self):
+        with self.lock:
+            ops = {name: dict(op, buckets=list(op["buckets"])) for name, op in self.ops.items()}
+            return {
+                "buckets_ms": list(LATENCY_BUCKETS_MS),
+                "ops": ops,
+                "counters": dict(self.counters),
+                "git_calls": list(self.git_calls),
+            }
+
+    def export(self, path):
+        if path.endswith(".csv"):
+            import csv
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, ["name", "count", "total_ms", "mean_ms", "p50_ms", "p95_ms", "max_ms"])
+                writer.writeheader()
+                writer.writerows(self.rows())
+                for name, value in sorted(self.snapshot()["counters"].items()):
+                    writer.writerow({"name": name, "count": value})
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+def timed(name):
+    def decorate(method):
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(name):
+                return method(self, *args, **kwargs)
+        wrapper.__name__ = method.__name__
+        return wrapper
+    return decorate
+
+
+def start_profile():
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profile(profiler, path=PROFILE_FILE):
+    profiler.disable()
+    import pstats
+    profiler.dump_stats(path)
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+    print(f"Profile written to {path}")
+
+
+class SyncWorker:
+    def __init__(self, helper):
+        self.helper = helper
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.last_failure = None
+        self.save_queued = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def pull(self):
+        self.helper.sync_pending += 1
+        self.jobs.put("pull")
+
+    def push(self):
+        self.helper.prepare_push()
+        self.helper.sync_pending += 1
+        self.jobs.put("push")
+
+    def save(self):
+        if self.helper.sync_pending:
+            self.save_queued = True
+            return False
+        self.save_queued = False
+        self.helper.save_data()
+        self.push()
+        return True
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            self.results.put(("started", job, None))
+            if job == "pull":
+                ok = self.helper.pull_changes()
+            else:
+                ok = self.helper.push_changes()
+            if not ok:
+                self.last_failure = self.helper.last_git
+            self.results.put(("done", job, ok))
+
+    def poll(self):
+        events = []
+        while True:
+            try:
+                event = self.results.get_nowait()
+            except queue.Empty:
+                if self.save_queued and not self.helper.sync_pending and self.thread.is_alive():
+                    self.save()
+                return events
+            state, job, ok = event
+            if state == "done" and job == "pull" and ok:
+                self.helper.merge_pulled()
+            if state == "done":
+                self.helper.sync_pending -= 1
+            events.append(event)
+
+    def stop(self, timeout=None):
+        self.jobs.put(None)
+        self.thread.join(timeout)
+        events = self.poll()
+        if self.save_queued and not self.helper.sync_pending:
+            self.save_queued = False
+            self.helper.save_data()
+            self.helper.prepare_push()
+            ok = self.helper.push_changes()
+            if not ok:
+                self.last_failure = self.helper.last_git
+            events.append(("done", "push", ok))
+        return events
+
+
+class ThreadScheduler:
+    def schedule(self, delay, callback):
+        timer = threading.Timer(delay, callback)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def cancel(self, handle):
+        handle.cancel()
+
+
+OP_SECTIONS = {
+    "add_ddl": "ddls",
+    "delete_ddl": "ddls",
+    "edit_ddl": "ddls",
+    "shop_add": "shopping",
+    "shop_remove": "shopping",
+    "shop_clear": "shopping",
+    "duty_next": "duty",
+    "duty_override": "duty",
+    "set_duty": "duty",
+    "set_roster": "roster",
+    "set_config": "config",
+    "archive_ddls": "ddls",
+}
+
+
+def ensure_unique_ddl_ids(data):
+    seen = set()
+    duplicates = []
+    for ddl in data["ddls"]:
+        if ddl["id"] in seen or not isinstance(ddl["id"], int):
+            duplicates.append(ddl)
+        else:
+            seen.add(ddl["id"])
+    next_id = max(data["config"].get("next_ddl_id", 1), max(seen, default=0) + 1)
+    for ddl in duplicates:
+        ddl["id"] = next_id
+        next_id += 1
+    changed = bool(duplicates) or data["config"].get("next_ddl_id") != next_id
+    data["config"]["next_ddl_id"] = next_id
+    return changed
+
+
+def ensure_duty_schedule(data):
+    duty = data.get("duty")
+    if isinstance(duty, dict) and {"anchor", "period", "offset"} <= set(duty):
+        return False
+    today = datetime.date.today()
+    monday = today - datetime.timedelta(days=today.weekday())
+    data["duty"] = {"anchor": monday.isoformat(), "period": DUTY_PERIOD, "offset": 0, "overrides": {}}
+    return True
+
+
+def apply_op(data, op):
+    kind = op["op"]
+    if kind == "add_ddl":
+        data["ddls"].append(dict(op["ddl"]))
+        data["config"]["next_ddl_id"] = max(data["config"].get("next_ddl_id", 1), op["ddl"]["id"] + 1)
+    elif kind == "delete_ddl":
+        ddl_id = op["id"] if "id" in op else op["ddl"]["id"]
+        data["ddls"] = [ddl for ddl in data["ddls"] if ddl["id"] != ddl_id]
+    elif kind == "archive_ddls":
+        ids = set(op["ids"])
+        data["ddls"] = [ddl for ddl in data["ddls"] if ddl["id"] not in ids]
+    elif kind == "edit_ddl":
+        for ddl in data["ddls"]:
+            if ddl["id"] == op["id"]:
+                ddl.update(date=op["date"], title=op["title"])
+    elif kind == "shop_add":
+        data["shopping"][op["item"]] = data["shopping"].get(op["item"], 0) + 1
+    elif kind == "shop_remove":
+        data["shopping"].pop(op["item"], None)
+    elif kind == "shop_clear":
+        data["shopping"].clear()
+    elif kind == "duty_next":
+        ensure_duty_schedule(data)
+        data["duty"]["offset"] += 1
+    elif kind == "duty_override":
+        ensure_duty_schedule(data)
+        overrides = data["duty"].setdefault("overrides", {})
+        overrides.update(op.get("set", {}))
+        for date in op.get("clear", []):
+            overrides.pop(date, None)
+    elif kind == "set_duty":
+        data["duty"] = copy.deepcopy(op["duty"])
+    elif kind == "set_roster":
+        data["roster"] = list(op["roster"])
+    elif kind == "set_config":
+        data["config"][op["key"]] = op["value"]
+
+
+def _ddl_map(ddls):
+    result = {}
+    for ddl in ddls:
+        key = ddl["id"]
+        if key in result:
+            key = (ddl["id"], ddl["date"], ddl["title"])
+        result[key] = ddl
+    return result
+
+
+def merge_ddls(base, ours, theirs, next_id=1):
+    if ours == base or ours == theirs:
+        return list(theirs)
+    if theirs == base:
+        return list(ours)
+    base_map, our_map, their_map = _ddl_map(base), _ddl_map(ours), _ddl_map(theirs)
+    merged = []
+    for key, ddl in their_map.items():
+        if key in our_map:
+            if key in base_map and our_map[key] != base_map[key]:
+                merged.append(our_map[key])
+            else:
+                merged.append(ddl)
+        elif key not in base_map or base_map[key] != ddl:
+            merged.append(ddl)
+    next_id = max([d["id"] + 1 for d in ours + theirs if isinstance(d["id"], int)] + [next_id])
+    for key, ddl in our_map.items():
+        if key in their_map:
+            if key not in base_map and their_map[key] != ddl:
+                merged.append(dict(ddl, id=next_id))
+                next_id += 1
+        elif key not in base_map or base_map[key] != ddl:
+            merged.append(ddl)
+    return merged
+
+
+def merge_counts(base, ours, theirs):
+    if ours == base or theirs == base:
+        return {item: count for item, count in (theirs if ours == base else ours).items() if count > 0}
+    merged = {}
+    for item in list(theirs) + [item for item in ours if item not in theirs]:
+        count = ours.get(item, 0) + theirs.get(item, 0) - base.get(item, 0)
+        if count > 0:
+            merged[item] = count
+    return merged
+
+
+def merge_roster(base, ours, theirs):
+    if ours == base:
+        return list(theirs)
+    return list(ours)
+
+
+def merge_mapping(base, ours, theirs):
+    merged = {}
+    for key in list(ours) + [key for key in theirs if key not in ours]:
+        if key in ours and (key not in base or ours[key] != base[key]):
+            merged[key] = ours[key]
+        elif key in theirs and key in ours:
+            merged[key] = theirs[key]
+        elif key in theirs and (key not in base or theirs[key] != base[key]):
+            merged[key] = theirs[key]
+    return merged
+
+
+def merge_duty(base, ours, theirs):
+    merged = merge_mapping(base, ours, theirs)
+    merged["offset"] = ours.get("offset", 0) + theirs.get("offset", 0) - base.get("offset", 0)
+    merged["overrides"] = merge_mapping(base.get("overrides", {}), ours.get("overrides", {}), theirs.get("overrides", {}))
+    return merged
+
+
+def merge_config(base, ours, theirs):
+    merged = {}
+    for key in list(theirs) + [key for key in ours if key not in theirs]:
+        if key == "next_ddl_id":
+            merged[key] = max(ours.get(key, 1), theirs.get(key, 1))
+        elif key in ours and (key not in base or ours[key] != base[key]):
+            merged[key] = ours[key]
+        elif key in theirs:
+            merged[key] = theirs[key]
+    return merged
+
+
+def merge_data(base, ours, theirs):
+    config = merge_config(base.get("config", {}), ours.get("config", {}), theirs.get("config", {}))
+    merged = {
+        "config": config,
+        "roster": merge_roster(base.get("roster", []), ours.get("roster", []), theirs.get("roster", [])),
+        "ddls": merge_ddls(base.get("ddls", []), ours.get("ddls", []), theirs.get("ddls", []), config.get("next_ddl_id", 1)),
+        "shopping": merge_counts(base.get("shopping", {}), ours.get("shopping", {}), theirs.get("shopping", {})),
+    }
+    if "duty" in ours or "duty" in theirs:
+        merged["duty"] = merge_duty(base.get("duty", {}), ours.get("duty", {}), theirs.get("duty", {}))
+    ensure_unique_ddl_ids(merged)
+    return merged
+
+
+def _read_data_file(path):
+    import dorm_binary
+    if dorm_binary.is_binary(path):
+        return dorm_binary.read_snapshot(path)
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return json.loads(text) if text.strip() else copy.deepcopy(DEFAULT_DATA)
+
+
+def merge_files(base_path, ours_path, theirs_path):
+    import dorm_binary
+    try:
+        loaded = [_read_data_file(path) for path in (base_path, ours_path, theirs_path)]
+    except (OSError, ValueError):
+        return 1
+    if isinstance(loaded[1], list):
+        base = loaded[0] if isinstance(loaded[0], list) else []
+        theirs = loaded[2] if isinstance(loaded[2], list) else []
+        with open(ours_path, "w", encoding="utf-8") as f:
+            f.write(_archive_text(merge_ddls(base, loaded[1], theirs)))
+        return 0
+    merged = merge_data(*loaded)
+    if dorm_binary.is_binary(ours_path):
+        dorm_binary.write_snapshot(merged, ours_path)
+    else:
+        with open(ours_path, "w", encoding="utf-8") as f:
+            json.dump(merged, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+def merge_driver_command():
+    if getattr(sys, "frozen", False):
+        parts = [sys.executable]
+    else:
+        parts = [sys.executable, os.path.abspath(__file__)]
+    quoted = " ".join(f'"{part}"' for part in parts).replace("\\", "/")
+    return f"{quoted} merge-driver %O %A %B"
+
+
+def _new_epoch():
+    import uuid
+    return uuid.uuid4().hex
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def storage_paths(data_file):
+    if data_file == DATA_FILE:
+        return JOURNAL_FILE, SUMMARY_FILE
+    base = os.path.splitext(data_file)[0]
+    return base + ".journal", base + ".summary.json"
+
+
+def archive_path(data_file):
+    return os.path.splitext(data_file)[0] + ".archive"
+
+
+def load_summary(path=SUMMARY_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            summary = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    for path, stamp in summary.get("files", {}).items():
+        if _file_stamp(path) != stamp:
+            return None
+    return summary
+
+
+def summary_upcoming(summary, today, k=3):
+    upcoming = [ddl for ddl in summary["upcoming"] if ddl["date"] >= today]
+    if len(upcoming) < k and len(summary["upcoming"]) >= SUMMARY_UPCOMING:
+        return None
+    return upcoming[:k]
+
+
+def summary_duty(summary, today):
+    schedule = summary.get("schedule")
+    if schedule and schedule.get("duty"):
+        return DutySchedule(schedule).on_duty(today)
+    return summary["duty"]
+
+
+def print_today(summary, today):
+    print(f"Dorm Helper | {today}")
+    print(f"Duty Today: {summary_duty(summary, today) or 'None'}")
+    upcoming = summary_upcoming(summary, today)
+    if upcoming:
+        print("Upcoming Deadlines:")
+        for ddl in upcoming:
+            print(f"   - {ddl['date']} : {ddl['title']}")
+
+
+class OperationJournal:
+    def __init__(self, path=JOURNAL_FILE, compact_bytes=JOURNAL_COMPACT_BYTES):
+        self.path = path
+        self.compact_bytes = compact_bytes
+        self.epoch = _new_epoch()
+        self.seq = 0
+
+    def append(self, op):
+        self.seq += 1
+        op["seq"] = self.seq
+        line = json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n"
+        if self.size() == 0:
+            line = json.dumps({"journal": self.epoch}) + "\n" + line
+        encoded = line.encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(encoded)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(encoded)
+
+    def replay(self, data):
+        base = data["config"].get("journal_seq")
+        self.epoch = _new_epoch()
+        self.seq = 0
+        if not os.path.exists(self.path):
+            return data
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    op = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    op = None
+                if not isinstance(op, dict):
+                    break
+                good += len(line)
+                if "journal" in op:
+                    self.epoch = op["journal"]
+                    continue
+                self.seq = op["seq"]
+                if base and base[0] == self.epoch and op["seq"] <= base[1]:
+                    continue
+                apply_op(data, op)
+        if good < self.size():
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+        return data
+
+    def marker(self):
+        return [self.epoch, self.seq]
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def needs_compaction(self):
+        return self.size() >= self.compact_bytes
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.epoch = _new_epoch()
+        self.seq = 0
+
+
+class DormHelper:
+    def __init__(self, journal=False, autosave_delay=None, scheduler=None, data_file=DATA_FILE, verbose=True,
+                 storage="json", metrics=None, warm_search=False):
+        if storage == "binary" and data_file == DATA_FILE:
+            data_file = BINARY_DATA_FILE
+        self.data_file = data_file
+        self.storage = storage
+        self.verbose = verbose
+        self.last_message = ""
+        self.metrics = metrics or Metrics()
+        self.last_git = None
+        self.reminders = None
+        self.warm_search = warm_search
+        self.watcher = None
+        self.disk_stamp = None
+        self.changed_sections = set()
+        journal_file, self.summary_file = storage_paths(data_file)
+        self.archive = DeadlineArchive(archive_path(data_file))
+        self.journal = OperationJournal(journal_file) if journal else None
+        self.bytes_written = 0
+        self._pending_ops = []
+        self.dirty = set()
+        self.lock = threading.RLock()
+        self.autosave_delay = autosave_delay
+        self.scheduler = scheduler or ThreadScheduler()
+        self._autosave_handle = None
+        self.sync_pending = 0
+        self._merge_driver_installed = False
+        self.set_data(self.load_data())
         self.check_daily_reminder()
 
-    def load_data(self):
-        if os.path.exists(DATA_FILE):
+    def set_data(self, data):
+        self.data = data
+        migrated = False
+        for section, migrate in (("ddls", ensure_unique_ddl_ids), ("duty", ensure_duty_schedule)):
+            if migrate(self.data):
+                self._mark_dirty(section)
+                migrated = True
+        if migrated and self.journal:
+            self.compact()
+        self.duty = DutySchedule(self.data)
+        self.ddl_index = DeadlineIndex(self.data["ddls"])
+        if self.warm_search:
+            self.ddl_index.warm()
+        self._ddl_slots = {ddl["id"]: pos for pos, ddl in enumerate(self.data["ddls"])}
+        if self.reminders:
+            self.reminders.reset(self.ddl_index.between(datetime.date.today().isoformat(), "9999-12-31"))
+
+    @timed("load_data")
+    def load_data(self, strict=False):
+        self.disk_stamp = _file_stamp(self.data_file)
+        data = self._load_snapshot(strict)
+        if self.journal:
+            data = self.journal.replay(data)
+        return data
+
+    def _load_snapshot(self, strict=False):
+        if os.path.exists(self.data_file):
             try:
-                with open(DATA_FILE, "r", encoding="utf-8") as f:
+                if self.storage == "binary":
+                    import dorm_binary
+                    return dorm_binary.read_snapshot(self.data_file)
+                with open(self.data_file, "r", encoding="utf-8") as f:
                     return json.load(f)
-            except json.JSONDecodeError:
-                return DEFAULT_DATA.copy()
+            except ValueError:
+                if strict:
+                    raise
+                return copy.deepcopy(DEFAULT_DATA)
         else:
-            return DEFAULT_DATA.copy()
+            return copy.deepcopy(DEFAULT_DATA)
 
+    @timed("write_snapshot")
+    def _write_snapshot(self):
+        if self.storage == "binary":
+            import dorm_binary
+            encoded = dorm_binary.encode_snapshot(self.data)
+        else:
+            encoded = json.dumps(self.data, ensure_ascii=False, indent=2).encode("utf-8")
+        tmp_path = self.data_file + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encoded)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.data_file)
+        self.disk_stamp = _file_stamp(self.data_file)
+        self.bytes_written += len(encoded)
+        self.metrics.count("bytes written", len(encoded))
+        self._pending_ops = []
+        self.dirty.clear()
+
+    @timed("save_data")
     def save_data(self):
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        if not self.dirty and os.path.exists(self.data_file):
+            return
+        self.reload_external()
+        if self.journal:
+            if self.journal.needs_compaction():
+                self.compact()
+            self.dirty.clear()
+        else:
+            self._write_snapshot()
+        self.write_summary()
 
-    def _git_command(self, args):
+    def summary(self, today=None):
+        if today is None:
+            today = datetime.date.today().isoformat()
+        return {
+            "duty": self.duty.on_duty(today),
+            "schedule": {"roster": self.data["roster"], "duty": self.data["duty"]},
+            "upcoming": self.ddl_index.upcoming(SUMMARY_UPCOMING, today),
+            "shopping": list(self.data["shopping"].items())[:5],
+        }
+
+    @timed("write_summary")
+    def write_summary(self):
+        summary = self.summary()
+        files = {self.data_file: _file_stamp(self.data_file)}
+        if self.journal:
+            files[self.journal.path] = _file_stamp(self.journal.path)
+        summary["files"] = files
+        with open(self.summary_file, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False)
+
+    def autosave(self):
+        with self.lock:
+            if self.sync_pending:
+                self._autosave_handle = self.scheduler.schedule(self.autosave_delay, self.autosave)
+                return
+            self._autosave_handle = None
+            self.save_data()
+
+    @timed("compact")
+    def compact(self):
+        self.reload_external()
+        if self.journal:
+            self.data["config"]["journal_seq"] = self.journal.marker()
+        self._write_snapshot()
+        if self.journal:
+            self.journal.clear()
+
+    def _log_op(self, op):
+        self._pending_ops.append(op)
+        self._mark_dirty(OP_SECTIONS[op["op"]])
+        if self.journal:
+            written = self.journal.append(op)
+            self.bytes_written += written
+            self.metrics.count("bytes written", written)
+            if self.journal.needs_compaction():
+                self.compact()
+
+    def _mark_dirty(self, section):
+        self.dirty.add(section)
+        if self.autosave_delay is None:
+            return
+        if self._autosave_handle is not None:
+            self.scheduler.cancel(self._autosave_handle)
+        self._autosave_handle = self.scheduler.schedule(self.autosave_delay, self.autosave)
+
+    def _run_git(self, args, stdout=None):
+        import subprocess
+        start = time.perf_counter()
         try:
-            result = subprocess.run(
-                ["git"] + args,
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return result.returncode == 0
-        except (subprocess.CalledProcessError, FileNotFoundError):
+            result = subprocess.run(["git"] + args, stdout=stdout or subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            code, output, error = result.returncode, result.stdout or "", result.stderr
+        except FileNotFoundError:
+            code, output, error = 127, "", "git not found"
+        error = error.strip().splitlines()[-1] if code and error.strip() else ""
+        self.metrics.git(args, code, (time.perf_counter() - start) * 1000, error)
+        self.last_git = {"args": args, "code": code, "error": error}
+        return code, output
+
+    def _git_command(self, args):
+        return self._run_git(args)[0] == 0
+
+    def _git_output(self, args):
+        code, output = self._run_git(args)
+        return output.strip() if code == 0 else None
+
+    def install_merge_driver(self):
+        if self._merge_driver_installed:
+            return True
+        attributes_path = self._git_output(["rev-parse", "--git-path", "info/attributes"])
+        if not attributes_path:
+            return False
+        lines = [f"{os.path.basename(self.data_file)} merge=dorm",
+                 f"{os.path.basename(self.archive.path)}/*.json merge=dorm"]
+        existing = ""
+        if os.path.exists(attributes_path):
+            with open(attributes_path, "r", encoding="utf-8") as f:
+                existing = f.read()
+        missing = [line for line in lines if line not in existing.splitlines()]
+        if missing:
+            os.makedirs(os.path.dirname(attributes_path) or ".", exist_ok=True)
+            with open(attributes_path, "a", encoding="utf-8") as f:
+                if existing and not existing.endswith("\n"):
+                    f.write("\n")
+                f.write("".join(line + "\n" for line in missing))
+        self._git_command(["config", "merge.dorm.name", "Dorm Helper structural merge"])
+        self._merge_driver_installed = self._git_command(["config", "merge.dorm.driver", merge_driver_command()])
+        return self._merge_driver_installed
+
+    def _sync_setting(self, key, default):
+        value = self.data["config"].get(key, default)
+        return value if isinstance(value, int) and value > 0 else 0
+
+    def pull_changes(self):
+        self.install_merge_driver()
+        self.commit_changes()
+        upstream = self._git_output(["rev-parse", "--verify", "-q", "@{u}"])
+        depth = self._sync_setting("sync_depth", SYNC_DEPTH)
+        pull = ["pull", "--no-rebase", "--no-edit"]
+        if self._git_command(pull + ([f"--depth={depth}"] if depth else [])):
+            return True
+        failure = self.last_git
+        if upstream and self._git_command(["fetch"]) and not self._git_command(["merge-base", "--is-ancestor", upstream, "@{u}"]):
+            if self._adopt_rewritten_upstream(upstream):
+                return True
+        elif self._git_output(["rev-parse", "--is-shallow-repository"]) == "true":
+            if self._git_command(["fetch", "--unshallow"]) and self._git_command(pull):
+                return True
+        self.last_git = failure
+        return False
+
+    def _data_paths(self, *revs):
+        archive = os.path.basename(self.archive.path)
+        paths = {self.data_file}
+        for rev in revs:
+            listed = self._git_output(["ls-tree", "-r", "--name-only", rev, "--", archive]) or ""
+            paths.update(path for path in listed.splitlines() if path.endswith(".json"))
+        return sorted(paths)
+
+    def _adopt_rewritten_upstream(self, old_upstream):
+        import tempfile
+        base = self._git_output(["merge-base", "HEAD", old_upstream])
+        paths = self._data_paths("HEAD", "@{u}")
+        with tempfile.TemporaryDirectory() as tmp:
+            merged = {}
+            for path in paths:
+                versions = []
+                for name, rev in (("base", base), ("ours", "HEAD"), ("theirs", "@{u}")):
+                    version = os.path.join(tmp, name)
+                    with open(version, "wb") as f:
+                        found = bool(rev) and self._run_git(["show", f"{rev}:{path}"], stdout=f)[0] == 0
+                    versions.append(version if found else None)
+                if versions[1] and versions[2]:
+                    if not versions[0]:
+                        versions[0] = os.path.join(tmp, "base")
+                        open(versions[0], "wb").close()
+                    if merge_files(*versions):
+                        return False
+                source = versions[1] or versions[2]
+                if source:
+                    with open(source, "rb") as f:
+                        merged[path] = f.read()
+        if not self._git_command(["reset", "--mixed", "-q", "@{u}"]):
             return False
+        for path, content in merged.items():
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(content)
+        self.commit_changes()
+        return True
+
+    @timed("merge_pulled")
+    def merge_pulled(self):
+        pending = self._pending_ops
+        data = self.load_data()
+        self.archive = DeadlineArchive(self.archive.path)
+        if not self.journal:
+            for op in pending:
+                apply_op(data, op)
+        self.changed_sections = self._apply_loaded(data)
+        self._pending_ops = pending
+
+    def _apply_loaded(self, data):
+        migrated = False
+        for section, migrate in (("ddls", ensure_unique_ddl_ids), ("duty", ensure_duty_schedule)):
+            if migrate(data):
+                self._mark_dirty(section)
+                migrated = True
+        changed = {key for key in set(data) | set(self.data) if key != "ddls" and data.get(key) != self.data.get(key)}
+        if {ddl["id"]: ddl for ddl in data["ddls"]} != {ddl["id"]: ddl for ddl in self.data["ddls"]}:
+            changed.add("ddls")
+        if "ddls" in changed:
+            self._update_ddls(data["ddls"])
+        for key in changed - {"ddls"}:
+            if key in data:
+                self.data[key] = data[key]
+            else:
+                del self.data[key]
+        self.duty = DutySchedule(self.data)
+        if migrated and self.journal:
+            self.compact()
+        return changed
+
+    def _update_ddls(self, ddls):
+        current = {ddl["id"]: ddl for ddl in self.data["ddls"]}
+        merged, added, removed = [], [], []
+        for ddl in ddls:
+            old = current.pop(ddl["id"], None)
+            if old is not None and old == ddl:
+                merged.append(old)
+            else:
+                if old is not None:
+                    removed.append(old)
+                merged.append(ddl)
+                added.append(ddl)
+        removed.extend(current.values())
+        self.data["ddls"] = merged
+        self._ddl_slots = {ddl["id"]: pos for pos, ddl in enumerate(merged)}
+        if len(added) + len(removed) > len(merged) // 4:
+            self.ddl_index = DeadlineIndex(merged)
+            if self.warm_search:
+                self.ddl_index.warm()
+            if self.reminders:
+                self.reminders.reset(self.ddl_index.between(datetime.date.today().isoformat(), "9999-12-31"))
+            return
+        for ddl in removed:
+            self.ddl_index.remove(ddl)
+            if self.reminders:
+                self.reminders.remove(ddl)
+        for ddl in added:
+            self.ddl_index.add(ddl)
+            if self.reminders:
+                self.reminders.add(ddl)
+
+    def start_watching(self):
+        self.watcher = FileWatcher(self.data_file)
+        return self.watcher
+
+    def check_external(self):
+        if self.watcher is not None and not self.watcher.pending():
+            return set()
+        return self.reload_external()
+
+    def reload_external(self):
+        stamp = _file_stamp(self.data_file)
+        if stamp is None or stamp == self.disk_stamp or not stamp[1]:
+            return set()
+        pending = self._pending_ops
+        try:
+            data = self.load_data(strict=True)
+        except (OSError, ValueError):
+            return set()
+        self.archive = DeadlineArchive(self.archive.path)
+        if not self.journal:
+            for op in pending:
+                apply_op(data, op)
+        self.changed_sections = self._apply_loaded(data)
+        self._pending_ops = pending
+        return self.changed_sections
 
     def startup_sync(self):
-        if self._git_command(["pull", "--rebase"]):
-            self.data = self.load_data()
+        if self.pull_changes():
+            self.merge_pulled()
             return True
         return False
 
-    def shutdown_sync(self):
-        if self._git_command(["add", DATA_FILE]):
+    def prepare_push(self):
+        if self.journal:
+            self.compact()
+
+    def _can_amend(self):
+        window = self._sync_setting("commit_window", COMMIT_WINDOW)
+        head = self._git_output(["log", "-1", "--format=%at %P%n%s"])
+        if not window or not head:
+            return False
+        (stamp, *parents), subject = head.splitlines()[0].split(), head.splitlines()[-1]
+        if len(parents) != 1 or not subject.startswith("Update data") or time.time() - int(stamp) > window:
+            return False
+        return self._git_output(["branch", "-r", "--contains", "HEAD"]) == ""
+
+    def commit_changes(self):
+        paths = [self.data_file] + ([self.archive.path] if os.path.isdir(self.archive.path) else [])
+        if self._git_command(["add"] + paths):
+            if self._git_command(["diff", "--cached", "--quiet"]):
+                return True
             today = datetime.date.today().isoformat()
-            self._git_command(["commit", "-m", f"Update data {today}"])
-            self._git_command(["push"])
+            amend = ["--amend"] if self._can_amend() else []
+            self._git_command(["commit", "-m", f"Update data {today}"] + amend)
+            return True
+        return False
+
+    def push_changes(self):
+        if self.commit_changes():
+            return self._git_command(["push"])
+        return False
+
+    def shutdown_sync(self):
+        self.prepare_push()
+        self.push_changes()
+
+    def set_sync_policy(self, window=None, depth=None):
+        for key, value in (("commit_window", window), ("sync_depth", depth)):
+            if value is not None:
+                self.data["config"][key] = value
+                self._log_op({"op": "set_config", "key": key, "value": value})
+        window = self._sync_setting("commit_window", COMMIT_WINDOW)
+        depth = self._sync_setting("sync_depth", SYNC_DEPTH)
+        commits = f"Saves are combined into one commit per {window // 60} minutes until pushed" if window else "Every save is a new commit"
+        self._say(commits + (f"; pulls fetch the last {depth} commits" if depth else "; pulls fetch the full history"))
+        return True
+
+    def squash_history(self, keep_days=SQUASH_KEEP_DAYS):
+        self.save_data()
+        self.prepare_push()
+        if self._git_output(["rev-parse", "--verify", "-q", "@{u}"]):
+            if not self.pull_changes():
+                self._say(f"Sync failed, history not squashed ({describe_git_failure(self.last_git)})")
+                return False
+            self.merge_pulled()
+            self.save_data()
+            self.prepare_push()
+            self.commit_changes()
+        cutoff = time.time() - keep_days * 86400
+        history = self._git_output(["log", "--first-parent", "--format=%H %ct", "HEAD"])
+        commits = [line.split() for line in (history or "").splitlines()]
+        cut = next((pos for pos, (_, stamp) in enumerate(commits) if int(stamp) < cutoff), len(commits))
+        if commits and self._git_output(["rev-parse", "--is-shallow-repository"]) == "true":
+            cut = min(cut, len(commits) - 1)
+        elif len(commits) - cut < 2:
+            self._say("Nothing to squash")
+            return False
+        baseline, stamp = commits[cut]
+        kept = [sha for sha, _ in commits[:cut]]
+        date = datetime.date.fromtimestamp(int(stamp)).isoformat()
+        new = self._git_output(["commit-tree", f"{baseline}^{{tree}}", "-m", f"Baseline data as of {date}"])
+        for sha in reversed(kept):
+            message = self._git_output(["log", "-1", "--format=%B", sha])
+            new = new and self._git_output(["commit-tree", f"{sha}^{{tree}}", "-p", new, "-m", message or "Update data"])
+        if not new or not self._git_command(["update-ref", "-m", "squash data history", "HEAD", new, commits[0][0]]):
+            self._say(f"Squash failed ({describe_git_failure(self.last_git)})")
+            return False
+        if self._git_output(["rev-parse", "--verify", "-q", "@{u}"]) and not self._git_command(["push", "--force-with-lease"]):
+            self._say(f"Squashed locally but push failed ({describe_git_failure(self.last_git)})")
+            return False
+        self._git_command(["reflog", "expire", "--expire=now", "--all"])
+        self._git_command(["gc", "-q", "--prune=now"])
+        self._say(f"Squashed history up to {baseline[:7]} into a baseline as of {date}, kept {len(kept)} newer commits")
+        return True
+
+    @timed("archive_old")
+    def archive_old(self, today=None):
+        days = self.data["config"].get("archive_after_days", ARCHIVE_AFTER_DAYS)
+        if days is None or days < 0:
+            return 0
+        today = today or datetime.date.today()
+        last = (today - datetime.timedelta(days=days + 1)).isoformat()
+        old, valid = [], {}
+        for ddl in self.ddl_index.between("", last):
+            if ddl["date"] not in valid:
+                try:
+                    valid[ddl["date"]] = _parse_date(ddl["date"]) is not None
+                except (TypeError, ValueError):
+                    valid[ddl["date"]] = False
+            if valid[ddl["date"]]:
+                old.append(ddl)
+        if not old:
+            return 0
+        self.archive.store(old, self.data["config"].get("archive_by", ARCHIVE_BY))
+        ids = {ddl["id"] for ddl in old}
+        self.data["ddls"] = [ddl for ddl in self.data["ddls"] if ddl["id"] not in ids]
+        self.set_data(self.data)
+        self._log_op({"op": "archive_ddls", "ids": sorted(ids)})
+        self._say(f"Archived {len(old)} deadlines older than {days} days")
+        return len(old)
+
+    def set_archive_policy(self, days=None, by=None):
+        if days is not None:
+            self.data["config"]["archive_after_days"] = days
+            self._log_op({"op": "set_config", "key": "archive_after_days", "value": days})
+        if by is not None:
+            self.data["config"]["archive_by"] = by
+            self._log_op({"op": "set_config", "key": "archive_by", "value": by})
+        config = self.data["config"]
+        days = config.get("archive_after_days", ARCHIVE_AFTER_DAYS)
+        self._say(f"Deadlines are archived {days} days after they are due, one file per {config.get('archive_by', ARCHIVE_BY)}"
+                  if days is not None and days >= 0 else "Archiving is off")
+        return True
+
+    @timed("search_history")
+    def search_history(self, query="", limit=None):
+        live = self.ddl_index.search(query, limit)
+        ids = {ddl["id"] for ddl in live}
+        archived = [ddl for ddl in self.archive.search(query, limit) if ddl["id"] not in ids]
+        merged = heapq.merge(archived, live, key=lambda ddl: (ddl["date"], ddl["id"]))
+        return list(itertools.islice(merged, limit))
+
+    def is_archived(self, ddl):
+        return self.ddl_index.get(ddl["id"]) is not ddl
+
+    def list_history(self, args):
+        limit = None
+        if len(args) >= 2 and args[-2] == "-n" and args[-1].isdigit():
+            args, limit = args[:-2], int(args[-1])
+        print("\nDeadline history:")
+        ddls = self.search_history(" ".join(args), limit)
+        if not ddls:
+            print("   (No deadlines)")
+        for ddl in ddls:
+            print(f"   [{ddl['id']}] {ddl['date']} | {ddl['title']}{' (archived)' if self.is_archived(ddl) else ''}")
+
+    def enable_reminders(self, on_change=None):
+        leads = self.data["config"].get("reminder_leads", REMINDER_LEADS)
+        fired = self.reminders.fired if self.reminders else 0.0
+        self.reminders = ReminderScheduler(leads, on_change=on_change, fired=fired)
+        self.reminders.reset(self.ddl_index.between(datetime.date.today().isoformat(), "9999-12-31"))
+        return self.reminders
+
+    def set_reminder_leads(self, leads):
+        leads = sorted({int(lead) for lead in leads if int(lead) >= 0}, reverse=True)
+        self.data["config"]["reminder_leads"] = leads
+        self._log_op({"op": "set_config", "key": "reminder_leads", "value": leads})
+        if self.reminders:
+            self.enable_reminders(self.reminders.on_change)
+        self._say(f"Reminders {', '.join(f'{lead}d' for lead in leads) or 'off'} before each deadline")
+        return True
+
+    def reminder_list(self):
+        leads = self.data["config"].get("reminder_leads", REMINDER_LEADS)
+        print(f"\nReminders: {', '.join(f'{lead}d' for lead in leads) or 'off'} before each deadline")
+        when = self.reminders.next_due() if self.reminders else None
+        if when is not None:
+            _, _, _, lead, ddl = self.reminders.heap[0]
+            print(f"   Next at {datetime.datetime.fromtimestamp(when):%Y-%m-%d %H:%M}: {reminder_text(ddl, lead)}")
 
     def check_daily_reminder(self):
         today = datetime.date.today().isoformat()
         if self.data["config"]["last_opened"] != today:
             self.data["config"]["last_opened"] = today
-            self.save_data()
 
+    @contextlib.contextmanager
+    def transaction(self):
+        with self.lock:
+            saved = copy.deepcopy(self.data), list(self._pending_ops), set(self.dirty)
+            journal, autosave_delay = self.journal, self.autosave_delay
+            self.journal, self.autosave_delay = None, None
+            try:
+                yield
+            except Exception:
+                self.set_data(saved[0])
+                self._pending_ops, self.dirty = saved[1], saved[2]
+                raise
+            finally:
+                self.journal, self.autosave_delay = journal, autosave_delay
+            if self.journal:
+                self.compact()
+                self.write_summary()
+
+    def _say(self, message):
+        self.last_message = message
+        if self.verbose:
+            print(message)
+
+    @timed("add_ddl")
     def add_ddl(self, args):
         if len(args) < 2:
-            print("Format error. Example: add 2025-12-25 Final Exam")
+            self._say("Format error. Example: add 2025-12-25 Final Exam")
             return
         date_str, title = args[0], " ".join(args[1:])
         try:
             datetime.datetime.strptime(date_str, "%Y-%m-%d")
         except ValueError:
-            print("Date format error. Use YYYY-MM-DD")
+            self._say("Date format error. Use YYYY-MM-DD")
             return
         
-        self.data["ddls"].append({
-            "id": len(self.data["ddls"]) + 1,
+        ddl = {
+            "id": self._allocate_ddl_id(),
             "date": date_str,
             "title": title
-        })
-        print(f"Added deadline: {date_str} - {title}")
+        }
+        self._ddl_slots[ddl["id"]] = len(self.data["ddls"])
+        self.data["ddls"].append(ddl)
+        self.ddl_index.add(ddl)
+        if self.reminders:
+            self.reminders.add(ddl)
+        self._log_op({"op": "add_ddl", "ddl": ddl})
+        self._say(f"Added deadline: [{ddl['id']}] {date_str} - {title}")
+        return ddl
+
+    def _allocate_ddl_id(self):
+        ddl_id = self.data["config"]["next_ddl_id"]
+        self.data["config"]["next_ddl_id"] = ddl_id + 1
+        return ddl_id
 
+    def get_ddl(self, ddl_id):
+        return self.ddl_index.get(ddl_id)
+
+    @timed("list_ddls")
     def list_ddls(self, args):
-        query = " ".join(args) if args else ""
-        sorted_ddls = sorted(self.data["ddls"], key=lambda x: x["date"])
+        limit = None
+        if len(args) >= 2 and args[-2] == "-n" and args[-1].isdigit():
+            args, limit = args[:-2], int(args[-1])
         print("\nDeadline list:")
-        if not sorted_ddls:
+        if not self.ddl_index:
             print("   (No deadlines)")
             return
-        for idx, ddl in enumerate(sorted_ddls, 1):
-            if query in ddl["title"] or query in ddl["date"]:
-                print(f"   [{idx}] {ddl['date']} | {ddl['title']}")
+        for ddl in self.ddl_index.search(" ".join(args), limit):
+            print(f"   [{ddl['id']}] {ddl['date']} | {ddl['title']}")
 
+    @timed("delete_ddl")
     def delete_ddl(self, args):
         if len(args) < 1:
+            self._say("Format error. Example: delete 3")
             return
         try:
-            idx = int(args[0]) - 1
-            if 0 <= idx < len(self.data["ddls"]):
-                deleted = self.data["ddls"].pop(idx)
-                print(f"Deleted: {deleted['date']} - {deleted['title']}")
+            ddl = self.get_ddl(int(args[0]))
+            if ddl is not None:
+                self.remove_ddl(ddl)
+                self._say(f"Deleted: {ddl['date']} - {ddl['title']}")
+                return ddl
             else:
-                print("Index does not exist")
+                self._say("ID does not exist")
+        except ValueError:
+            self._say("Please enter a number")
+
+    @timed("edit_ddl")
+    def edit_ddl(self, args):
+        if len(args) < 3:
+            self._say("Format error. Example: edit 3 2025-12-26 Final Exam")
+            return
+        try:
+            ddl = self.get_ddl(int(args[0]))
         except ValueError:
-            print("Please enter a number")
+            self._say("Please enter a number")
+            return
+        if ddl is None:
+            self._say("ID does not exist")
+            return
+        date_str, title = args[1], " ".join(args[2:])
+        try:
+            datetime.datetime.strptime(date_str, "%Y-%m-%d")
+        except ValueError:
+            self._say("Date format error. Use YYYY-MM-DD")
+            return
+        self.ddl_index.remove(ddl)
+        ddl["date"], ddl["title"] = date_str, title
+        self.ddl_index.add(ddl)
+        if self.reminders:
+            self.reminders.add(ddl)
+        self._log_op({"op": "edit_ddl", "id": ddl["id"], "date": date_str, "title": title})
+        self._say(f"Updated: [{ddl['id']}] {date_str} - {title}")
+        return ddl
+
+    @timed("remove_ddl")
+    def remove_ddl(self, ddl):
+        if not self.ddl_index.remove(ddl):
+            return False
+        if self.reminders:
+            self.reminders.remove(ddl)
+        ddls = self.data["ddls"]
+        pos = self._ddl_slots.pop(ddl["id"])
+        del ddls[pos]
+        for later in range(pos, len(ddls)):
+            self._ddl_slots[ddls[later]["id"]] = later
+        self._log_op({"op": "delete_ddl", "id": ddl["id"]})
+        return True
 
+    @timed("shop_add")
     def shop_add(self, args):
         if len(args) < 1:
             return
@@ -113,7 +1710,19 @@ class DormHelper:
             self.data["shopping"][item] += 1
         else:
             self.data["shopping"][item] = 1
-        print(f"Added [{item}] (count: {self.data['shopping'][item]})")
+        self._log_op({"op": "shop_add", "item": item})
+        self._say(f"Added [{item}] (count: {self.data['shopping'][item]})")
+        return self.data["shopping"][item]
+
+    @timed("shop_remove")
+    def shop_remove(self, item):
+        if item in self.data["shopping"]:
+            del self.data["shopping"][item]
+            self._log_op({"op": "shop_remove", "item": item})
+            self._say(f"Removed [{item}]")
+            return True
+        self._say("Item does not exist")
+        return False
 
     def shop_list(self, args):
         print("\nShopping list:")
@@ -123,81 +1732,452 @@ class DormHelper:
         for idx, (item, count) in enumerate(self.data["shopping"].items(), 1):
             print(f"   [{idx}] {item} x {count}")
 
+    @timed("shop_clear")
     def shop_clear(self):
         self.data["shopping"].clear()
-        print("Shopping list cleared")
+        self._log_op({"op": "shop_clear"})
+        self._say("Shopping list cleared")
+        return True
 
     def duty_list(self):
         print("\nDuty roster:")
         if not self.data["roster"]:
             print("   (No personnel)")
             return
-        print(f"   Current: {self.data['roster'][0]}")
+        print(f"   Current: {self.duty.on_duty() or 'None'}")
         print("   Order:")
         for idx, person in enumerate(self.data["roster"], 1):
             print(f"      [{idx}] {person}")
+        self.duty_weeks(["4"])
 
+    def duty_weeks(self, args):
+        try:
+            count = int(args[0]) if args else 4
+        except ValueError:
+            self._say("Please enter a number")
+            return
+        if not self.data["roster"]:
+            return
+        print(f"   Every {self.data['duty']['period']} days from:")
+        for start, person in self.duty.upcoming(count):
+            print(f"      {start} | {person or '(Skipped)'}")
+
+    @timed("duty_next")
     def duty_next(self):
         if len(self.data["roster"]) < 2:
-            print("Need at least 2 people to rotate")
+            self._say("Need at least 2 people to rotate")
             return
-        current = self.data["roster"].pop(0)
-        self.data["roster"].append(current)
-        print(f"Rotated. Current: {self.data['roster'][0]}")
+        self.data["duty"]["offset"] += 1
+        self._log_op({"op": "duty_next"})
+        self._say(f"Rotated. Current: {self.duty.on_duty()}")
+        return True
+
+    def _duty_slot(self, date_str):
+        try:
+            return self.duty.slot(datetime.datetime.strptime(date_str, "%Y-%m-%d").date())
+        except ValueError:
+            self._say("Date format error. Use YYYY-MM-DD")
+            return None
+
+    def _override_duty(self, changes):
+        overrides = self.data["duty"].setdefault("overrides", {})
+        op = {"op": "duty_override", "set": {}, "clear": []}
+        for slot, person in changes:
+            start = self.duty.slot_start(slot)
+            if person == self.duty.scheduled(slot):
+                overrides.pop(start, None)
+                op["clear"].append(start)
+            else:
+                overrides[start] = person
+                op["set"][start] = person
+        self._log_op(op)
+
+    @timed("duty_skip")
+    def duty_skip(self, args):
+        if len(args) < 1:
+            self._say("Format error. Example: duty skip 2025-12-22")
+            return
+        slot = self._duty_slot(args[0])
+        if slot is None:
+            return
+        self._override_duty([(slot, None)])
+        self._say(f"No duty from {self.duty.slot_start(slot)}")
+        return True
+
+    @timed("duty_swap")
+    def duty_swap(self, args):
+        if len(args) < 2:
+            self._say("Format error. Example: duty swap 2025-12-22 2025-12-29")
+            return
+        slot_a, slot_b = self._duty_slot(args[0]), self._duty_slot(args[1])
+        if slot_a is None or slot_b is None:
+            return
+        person_a, person_b = self.duty.at_slot(slot_a), self.duty.at_slot(slot_b)
+        self._override_duty([(slot_a, person_b), (slot_b, person_a)])
+        self._say(f"Swapped: {self.duty.slot_start(slot_a)} {person_b} <-> {self.duty.slot_start(slot_b)} {person_a}")
+        return True
+
+    @timed("set_duty_period")
+    def set_duty_period(self, period):
+        if period < 1:
+            self._say("Period must be at least 1 day")
+            return
+        today = datetime.date.today()
+        offset = self.duty.slot(today) + self.data["duty"]["offset"]
+        if self.data["roster"]:
+            offset %= len(self.data["roster"])
+        self.data["duty"] = {"anchor": today.isoformat(), "period": period, "offset": offset, "overrides": {}}
+        self._log_op({"op": "set_duty", "duty": self.data["duty"]})
+        self._say(f"Duty now rotates every {period} days")
+        return True
+
+    @timed("set_roster")
+    def set_roster(self, roster):
+        self.data["roster"] = list(roster)
+        self._log_op({"op": "set_roster", "roster": self.data["roster"]})
+
+class DormHall:
+    def __init__(self, data_dir, capacity=HALL_CAPACITY, journal=False):
+        self.data_dir = data_dir
+        self.capacity = capacity
+        self.journal = journal
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._dorm_locks = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "flushes": 0}
+        self._flusher = None
+        self._stop_flusher = threading.Event()
+        os.makedirs(data_dir, exist_ok=True)
+
+    def path(self, dorm_id):
+        dorm_id = str(dorm_id)
+        if not dorm_id or not all(c.isalnum() or c in "-_" for c in dorm_id):
+            raise ValueError(f"Invalid dorm id: {dorm_id!r}")
+        return os.path.join(self.data_dir, f"{dorm_id}.json")
+
+    def _lock_for(self, dorm_id):
+        with self._cache_lock:
+            lock = self._dorm_locks.get(dorm_id)
+            if lock is None:
+                lock = self._dorm_locks[dorm_id] = threading.RLock()
+            return lock
+
+    @contextlib.contextmanager
+    def dorm(self, dorm_id):
+        dorm_id = str(dorm_id)
+        with self._lock_for(dorm_id):
+            yield self._get_locked(dorm_id)
+
+    def _get_locked(self, dorm_id):
+        with self._cache_lock:
+            helper = self._cache.get(dorm_id)
+            if helper is not None:
+                self._cache.move_to_end(dorm_id)
+                self.stats["hits"] += 1
+                return helper
+            self.stats["misses"] += 1
+        helper = DormHelper(journal=self.journal, data_file=self.path(dorm_id), verbose=False)
+        with self._cache_lock:
+            self._cache[dorm_id] = helper
+        self._evict(keep=dorm_id)
+        return helper
+
+    def _evict(self, keep=None):
+        with self._cache_lock:
+            excess = len(self._cache) - self.capacity
+            candidates = [key for key in self._cache if key != keep][:excess * 2 + 1] if excess > 0 else []
+        for dorm_id in candidates:
+            if excess <= 0:
+                break
+            lock = self._lock_for(dorm_id)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                with self._cache_lock:
+                    helper = self._cache.get(dorm_id)
+                if helper is None:
+                    continue
+                with helper.lock:
+                    helper.save_data()
+                with self._cache_lock:
+                    if self._cache.pop(dorm_id, None) is not None:
+                        self.stats["evictions"] += 1
+                        excess -= 1
+            finally:
+                lock.release()
+
+    def loaded(self):
+        with self._cache_lock:
+            return list(self._cache)
+
+    def flush(self):
+        with self._cache_lock:
+            dirty = [dorm_id for dorm_id, helper in self._cache.items() if helper.dirty]
+        for dorm_id in dirty:
+            with self._lock_for(dorm_id):
+                with self._cache_lock:
+                    helper = self._cache.get(dorm_id)
+                if helper is not None:
+                    helper.save_data()
+        with self._cache_lock:
+            self.stats["flushes"] += 1
+        return len(dirty)
+
+    def start_flusher(self, interval=AUTOSAVE_DELAY):
+        def run():
+            while not self._stop_flusher.wait(interval):
+                self.flush()
+        self._stop_flusher.clear()
+        self._flusher = threading.Thread(target=run, daemon=True)
+        self._flusher.start()
+
+    def close(self):
+        if self._flusher is not None:
+            self._stop_flusher.set()
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+
+def describe_git_failure(failure):
+    if not failure:
+        return "offline mode"
+    text = f"git {failure['args'][0]} exited with {failure['code']}"
+    return f"{text}: {failure['error']}" if failure["error"] else text
+
+
+def print_sync_events(events, sync=None):
+    for state, job, ok in events:
+        if state == "done":
+            detail = describe_git_failure(sync.last_failure if sync else None)
+            print(f"[sync] {job} {'ok' if ok else f'failed ({detail})'}")
+
+def format_stats(metrics):
+    lines = [f"{'operation':24} {'count':>7} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}"]
+    for row in metrics.rows():
+        lines.append(f"{row['name']:24} {row['count']:>7} {row['mean_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['max_ms']:>9.2f}")
+    for name, value in sorted(metrics.snapshot()["counters"].items()):
+        lines.append(f"{name:24} {value:>7}")
+    return lines
+
+
+def print_stats(metrics):
+    print("\n".join(format_stats(metrics)))
+
+
+def run_command(helper, sync, cmd):
+    if cmd[0] == "add":
+        helper.add_ddl(cmd[1:])
+    elif cmd[0] == "list":
+        helper.list_ddls(cmd[1:])
+    elif cmd[0] == "delete":
+        helper.delete_ddl(cmd[1:])
+    elif cmd[0] == "edit":
+        helper.edit_ddl(cmd[1:])
+    elif cmd[0] == "shop":
+        if len(cmd) < 2:
+            return True
+        if cmd[1] == "add":
+            helper.shop_add(cmd[2:])
+        elif cmd[1] == "list":
+            helper.shop_list(cmd[2:])
+        elif cmd[1] == "clear":
+            helper.shop_clear()
+    elif cmd[0] == "duty":
+        if len(cmd) < 2:
+            helper.duty_list()
+        elif cmd[1] == "next":
+            helper.duty_next()
+        elif cmd[1] == "list":
+            helper.duty_list()
+        elif cmd[1] == "weeks":
+            helper.duty_weeks(cmd[2:])
+        elif cmd[1] == "skip":
+            helper.duty_skip(cmd[2:])
+        elif cmd[1] == "swap":
+            helper.duty_swap(cmd[2:])
+        elif cmd[1] == "period" and len(cmd) > 2 and cmd[2].isdigit():
+            helper.set_duty_period(int(cmd[2]))
+    elif cmd[0] == "history":
+        helper.list_history(cmd[1:])
+    elif cmd[0] == "archive":
+        if len(cmd) > 2 and cmd[1] == "after" and cmd[2].lstrip("-").isdigit():
+            helper.set_archive_policy(days=int(cmd[2]))
+        elif len(cmd) > 2 and cmd[1] == "by" and cmd[2] in ("month", "year"):
+            helper.set_archive_policy(by=cmd[2])
+        elif len(cmd) > 1 and cmd[1] == "off":
+            helper.set_archive_policy(days=-1)
+        elif not helper.archive_old():
+            print("Nothing to archive")
+    elif cmd[0] == "sync" and len(cmd) > 2 and cmd[2].isdigit():
+        if cmd[1] == "window":
+            helper.set_sync_policy(window=int(cmd[2]) * 60)
+        elif cmd[1] == "depth":
+            helper.set_sync_policy(depth=int(cmd[2]))
+    elif cmd[0] == "remind":
+        if len(cmd) > 1 and all(arg.isdigit() for arg in cmd[1:]):
+            helper.set_reminder_leads(cmd[1:])
+        else:
+            helper.reminder_list()
+    elif cmd[0] == "stats":
+        if len(cmd) > 1 and cmd[1] == "export":
+            print(f"Stats written to {helper.metrics.export(cmd[2] if len(cmd) > 2 else STATS_FILE)}")
+        else:
+            print_stats(helper.metrics)
+    elif cmd[0] == "save":
+        if not sync.save():
+            print("Sync in progress, saving when it finishes")
+    elif cmd[0] == "quit":
+        return False
+    return True
+
+class BatchError(Exception):
+    pass
+
+
+def apply_batch_command(helper, cmd):
+    if cmd[0] == "add":
+        return helper.add_ddl(cmd[1:])
+    if cmd[0] == "delete":
+        return helper.delete_ddl(cmd[1:])
+    if cmd[0] == "edit":
+        return helper.edit_ddl(cmd[1:])
+    if cmd[0] == "shop" and len(cmd) > 1:
+        if cmd[1] == "add":
+            return helper.shop_add(cmd[2:])
+        if cmd[1] == "remove" and len(cmd) > 2:
+            return helper.shop_remove(cmd[2])
+        if cmd[1] == "clear":
+            return helper.shop_clear()
+    if cmd[0] == "duty" and len(cmd) > 1:
+        if cmd[1] == "next":
+            return helper.duty_next()
+        if cmd[1] == "skip":
+            return helper.duty_skip(cmd[2:])
+        if cmd[1] == "swap":
+            return helper.duty_swap(cmd[2:])
+        if cmd[1] == "period" and len(cmd) > 2 and cmd[2].isdigit():
+            return helper.set_duty_period(int(cmd[2]))
+    helper._say(f"Unknown batch command: {' '.join(cmd)}")
+    return None
+
+
+def run_batch(helper, lines, sync=True):
+    verbose, helper.verbose = helper.verbose, False
+    count = 0
+    start = time.perf_counter()
+    try:
+        with helper.transaction():
+            for number, line in enumerate(lines, 1):
+                cmd = line.strip().split()
+                if not cmd or cmd[0].startswith("#"):
+                    continue
+                helper.last_message = ""
+                if not apply_batch_command(helper, cmd):
+                    raise BatchError(f"Line {number}: {line.strip()} ({helper.last_message or 'invalid command'})")
+                count += 1
+            applied = time.perf_counter() - start
+    except BatchError as e:
+        print(f"Batch aborted, nothing was changed. {e}")
+        return False
+    finally:
+        helper.verbose = verbose
+    helper.save_data()
+    saved = time.perf_counter() - start
+    rate = count / applied if applied else float("inf")
+    print(f"Applied {count} commands in {applied * 1000:.1f} ms ({rate:.0f} commands/s), saved in {(saved - applied) * 1000:.1f} ms")
+    if sync and count:
+        if helper.pull_changes():
+            helper.merge_pulled()
+            helper.save_data()
+        helper.prepare_push()
+        ok = helper.push_changes()
+        detail = describe_git_failure(helper.last_git)
+        print(f"[sync] push {'ok' if ok else f'failed ({detail})'} in {(time.perf_counter() - start - saved) * 1000:.1f} ms")
+    return True
+
 
 if __name__ == "__main__":
-    helper = DormHelper()
-    helper.startup_sync()
+    if len(sys.argv) > 1 and sys.argv[1] == "merge-driver":
+        sys.exit(merge_files(*sys.argv[2:5]))
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        import dorm_server
+        dorm_server.main(sys.argv[2:])
+        sys.exit(0)
 
     today = datetime.date.today().isoformat()
-    print(f"Dorm Helper | {today}")
-    
-    print(f"Duty Today: {helper.data['roster'][0] if helper.data['roster'] else 'None'}")
-    
-    sorted_ddls = sorted(helper.data["ddls"], key=lambda x: x["date"])[:3]
-    if sorted_ddls:
-        print("Upcoming Deadlines:")
-        for ddl in sorted_ddls:
-            print(f"   - {ddl['date']} : {ddl['title']}")
+    journal = "--journal" in sys.argv[1:]
+    storage = "binary" if "--binary" in sys.argv[1:] else "json"
+    if len(sys.argv) > 1 and sys.argv[1] == "today":
+        data_file = BINARY_DATA_FILE if storage == "binary" else DATA_FILE
+        summary = load_summary(storage_paths(data_file)[1])
+        if summary is None or summary_upcoming(summary, today) is None:
+            if storage == "binary" and not journal and os.path.exists(data_file):
+                import dorm_binary
+                summary = dorm_binary.snapshot_summary(data_file, today, SUMMARY_UPCOMING)
+            else:
+                summary = DormHelper(journal=journal, storage=storage).summary(today)
+        print_today(summary, today)
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "archive":
+        helper = DormHelper(journal=journal, storage=storage)
+        if not helper.archive_old():
+            print("Nothing to archive")
+        helper.save_data()
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "squash-history":
+        keep_days = SQUASH_KEEP_DAYS
+        if "--keep-days" in sys.argv[2:]:
+            keep_days = int(sys.argv[sys.argv.index("--keep-days") + 1])
+        helper = DormHelper(journal=journal, storage=storage)
+        sys.exit(0 if helper.squash_history(keep_days) else 1)
+    if len(sys.argv) > 1 and sys.argv[1] == "run":
+        paths = [arg for arg in sys.argv[2:] if not arg.startswith("--")]
+        if paths and paths[0] != "-":
+            with open(paths[0], "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        else:
+            lines = sys.stdin.readlines()
+        profiler = start_profile() if "--profile" in sys.argv[2:] else None
+        helper = DormHelper(journal=journal, storage=storage)
+        ok = run_batch(helper, lines, sync="--no-sync" not in sys.argv[2:])
+        if profiler:
+            stop_profile(profiler)
+        sys.exit(0 if ok else 1)
+
+    profiler = start_profile() if "--profile" in sys.argv[1:] else None
+    helper = DormHelper(journal=journal, autosave_delay=AUTOSAVE_DELAY, storage=storage)
+    helper.archive_old()
+    sync = SyncWorker(helper)
+    sync.pull()
+    reminders = ReminderThread(helper)
+    helper.start_watching()
+
+    print_today(helper.summary(today), today)
     
     while True:
         try:
             cmd = input("(Dorm) > ").strip().split()
-            if not cmd:
-                continue
-            
-            if cmd[0] == "add":
-                helper.add_ddl(cmd[1:])
-            elif cmd[0] == "list":
-                helper.list_ddls(cmd[1:])
-            elif cmd[0] == "delete":
-                helper.delete_ddl(cmd[1:])
-            elif cmd[0] == "shop":
-                if len(cmd) < 2:
+            with helper.lock:
+                print_sync_events(sync.poll(), sync)
+                if not helper.sync_pending:
+                    changed = helper.check_external()
+                    if changed:
+                        print(f"[reload] {helper.data_file} changed on disk, reloaded {', '.join(sorted(changed))}")
+                if not cmd:
                     continue
-                if cmd[1] == "add":
-                    helper.shop_add(cmd[2:])
-                elif cmd[1] == "list":
-                    helper.shop_list(cmd[2:])
-                elif cmd[1] == "clear":
-                    helper.shop_clear()
-            elif cmd[0] == "duty":
-                if len(cmd) < 2:
-                    helper.duty_list()
-                elif cmd[1] == "next":
-                    helper.duty_next()
-                elif cmd[1] == "list":
-                    helper.duty_list()
-            elif cmd[0] == "save":
-                helper.save_data()
-                helper.shutdown_sync()
-            elif cmd[0] == "quit":
-                helper.save_data()
-                helper.shutdown_sync()
-                break
+                if not run_command(helper, sync, cmd):
+                    reminders.stop()
+                    sync.save()
+                    print_sync_events(sync.stop(), sync)
+                    break
         except KeyboardInterrupt:
-            helper.save_data()
-            helper.shutdown_sync()
+            reminders.stop()
+            with helper.lock:
+                sync.save()
+                print_sync_events(sync.stop(), sync)
             break
         except Exception as e:
-            print(f"Error: {str(e)}")
\ No newline at end of file
+            print(f"Error: {str(e)}")
+    if profiler:
+        stop_profile(profiler)
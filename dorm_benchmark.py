@@ -0,0 +1,802 @@
+import io
+import os
+import sys
+import copy
+import json
+import time
+import random
+import tempfile
+import contextlib
+import datetime
+import subprocess
+import asyncio
+import threading
+
+import dorm_assistant
+from dorm_assistant import DormHelper, DormHall
+
+
+COURSES = ["Calculus", "Linear Algebra", "Physics", "Chemistry", "Data Structures", "Operating Systems",
+           "Computer Networks", "English", "History", "Economics", "Statistics", "Discrete Math"]
+TASKS = ["Homework", "Lab Report", "Quiz", "Midterm", "Final Exam", "Essay", "Project", "Reading", "Presentation"]
+SURNAMES = ["Zhang", "Li", "Wang", "Zhao", "Liu", "Chen", "Yang", "Huang", "Zhou", "Wu", "Xu", "Sun"]
+GIVEN_NAMES = ["San", "Si", "Wu", "Liu", "Wei", "Fang", "Min", "Jing", "Lei", "Yan", "Hao", "Ting"]
+GROCERIES = ["Milk", "Eggs", "Bread", "Rice", "Noodles", "Apples", "Tissues", "Soap", "Detergent", "Tea",
+             "Coffee", "Toothpaste", "Shampoo", "Trash Bags", "Batteries", "Snacks", "Water", "Sponges"]
+
+
+def make_data(num_ddls, seed=0, num_items=50, roster_size=4):
+    rng = random.Random(seed)
+    start = datetime.date(2020, 1, 1)
+    ddls = []
+    for i in range(num_ddls):
+        date = start + datetime.timedelta(days=rng.randrange(365 * 10))
+        title = f"{rng.choice(COURSES)} {rng.choice(TASKS)} {rng.randrange(1, 15)}"
+        ddls.append({"id": i + 1, "date": date.isoformat(), "title": title})
+    roster = [f"{SURNAMES[i % len(SURNAMES)]} {GIVEN_NAMES[i // len(SURNAMES) % len(GIVEN_NAMES)]}"
+              + (f" {i // (len(SURNAMES) * len(GIVEN_NAMES)) + 1}" if i >= len(SURNAMES) * len(GIVEN_NAMES) else "")
+              for i in range(roster_size)]
+    items = [GROCERIES[i] if i < len(GROCERIES) else f"{GROCERIES[i % len(GROCERIES)]} #{i}" for i in range(num_items)]
+    return {
+        "config": {"last_opened": "", "next_ddl_id": num_ddls + 1},
+        "roster": roster,
+        "ddls": ddls,
+        "shopping": {item: rng.randrange(1, 5) for item in items},
+    }
+
+
+def write_data(data, path=dorm_assistant.DATA_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+@contextlib.contextmanager
+def workdir():
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(old_cwd)
+
+
+def _mutate(helper, i):
+    if i % 3 == 0:
+        helper.add_ddl(["2030-01-01", f"Bench {i}"])
+    elif i % 3 == 1:
+        helper.shop_add([f"bench{i % 7}"])
+    else:
+        helper.duty_next()
+
+
+def bench_journal(num_ddls=5000, mutations=300):
+    results = {}
+    for mode in ("full", "journal"):
+        with workdir():
+            with open(dorm_assistant.DATA_FILE, "w", encoding="utf-8") as f:
+                json.dump(make_data(num_ddls), f)
+            helper = DormHelper(journal=(mode == "journal"), verbose=False)
+            helper.bytes_written = 0
+            start = time.perf_counter()
+            for i in range(mutations):
+                _mutate(helper, i)
+                helper.save_data()
+            elapsed = time.perf_counter() - start
+        results[mode] = {
+            "bytes_per_mutation": helper.bytes_written / mutations,
+            "ms_per_mutation": elapsed * 1000 / mutations,
+        }
+    return results
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _import_ms(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=HERE
+    )
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1])
+    return cumulative / 1000
+
+
+def _wall_ms(args, marker=None):
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable] + args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in proc.stdout:
+        if marker and line.strip() == marker:
+            elapsed = time.perf_counter() - start
+            proc.wait()
+            return elapsed * 1000
+    proc.wait()
+    if marker or proc.returncode != 0:
+        return float("nan")
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_startup(num_ddls=50000):
+    results = {
+        "import": {
+            "dorm_assistant_ms": _import_ms("dorm_assistant"),
+            "dorm_helper_gui_ms": _import_ms("dorm_helper_gui"),
+        }
+    }
+    cli = os.path.join(HERE, "dorm_assistant.py")
+    gui = os.path.join(HERE, "dorm_helper_gui.py")
+    with workdir():
+        with open(dorm_assistant.DATA_FILE, "w", encoding="utf-8") as f:
+            json.dump(make_data(num_ddls), f)
+        cold = _wall_ms([cli, "today"])
+        cold_paint = _wall_ms([gui, "--exit-after-paint"], "painted")
+        helper = DormHelper(verbose=False)
+        helper.dirty.add("config")
+        helper.save_data()
+        cached = _wall_ms([cli, "today"])
+        cached_paint = _wall_ms([gui, "--exit-after-paint"], "painted")
+    results["today"] = {"full_load_ms": cold, "summary_cache_ms": cached}
+    results["first_paint"] = {"full_load_ms": cold_paint, "summary_cache_ms": cached_paint}
+    return results
+
+
+def bench_hall(rooms=2000, requests=20000, threads=8, capacity=512):
+    latencies = []
+    with workdir() as tmp:
+        hall = DormHall(os.path.join(tmp, "hall"), capacity=capacity)
+
+        def worker(seed, count):
+            rng = random.Random(seed)
+            local = []
+            for i in range(count):
+                dorm_id = f"room{int(rooms * rng.random() ** 3)}"
+                start = time.perf_counter()
+                with hall.dorm(dorm_id) as helper:
+                    _mutate(helper, i)
+                local.append(time.perf_counter() - start)
+            latencies.extend(local)
+
+        hall.start_flusher(0.5)
+        start = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(n, requests // threads)) for n in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - start
+        hall.close()
+    latencies.sort()
+    return {
+        "throughput": {
+            "requests_per_s": len(latencies) / elapsed,
+            "p50_ms": latencies[len(latencies) // 2] * 1000,
+            "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        },
+        "cache": {key: float(value) for key, value in hall.stats.items()},
+    }
+
+
+async def _http_client(port, count, depth, latencies, rng):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    sent = 0
+    while sent < count:
+        batch = min(depth, count - sent)
+        start = time.perf_counter()
+        for _ in range(batch):
+            if rng.random() < 0.2:
+                body = json.dumps({"item": f"item{rng.randrange(100)}"}).encode()
+                writer.write(b"POST /shopping HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+            else:
+                writer.write(b"GET /today HTTP/1.1\r\n\r\n")
+        await writer.drain()
+        for _ in range(batch):
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+        sent += batch
+    writer.close()
+
+
+def bench_server(requests=20000, connections=16, depth=1):
+    import dorm_server
+
+    results = {}
+    with workdir():
+        with open(dorm_assistant.DATA_FILE, "w", encoding="utf-8") as f:
+            json.dump(make_data(5000), f)
+        ready = threading.Event()
+        state = {}
+
+        def run_server():
+            async def main():
+                server = dorm_server.DormServer()
+                state["listener"] = await server.start("127.0.0.1", 0)
+                state["loop"] = asyncio.get_running_loop()
+                ready.set()
+                async with state["listener"]:
+                    try:
+                        await state["listener"].serve_forever()
+                    except asyncio.CancelledError:
+                        pass
+            asyncio.run(main())
+
+        thread = threading.Thread(target=run_server, daemon=True)
+        thread.start()
+        ready.wait()
+        port = state["listener"].sockets[0].getsockname()[1]
+        for mode, pipeline in (("keep_alive", depth), ("pipelined", max(depth, 16))):
+            latencies = []
+            rng = random.Random(0)
+
+            async def drive():
+                per_connection = requests // connections
+                await asyncio.gather(*[
+                    _http_client(port, per_connection, pipeline, latencies, rng) for _ in range(connections)
+                ])
+
+            start = time.perf_counter()
+            asyncio.run(drive())
+            elapsed = time.perf_counter() - start
+            latencies.sort()
+            results[mode] = {
+                "requests_per_s": len(latencies) / elapsed,
+                "p50_ms": latencies[len(latencies) // 2] * 1000,
+                "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+            }
+        state["loop"].call_soon_threadsafe(state["listener"].close)
+        thread.join(5)
+    return results
+
+
+def bench_storage(sizes=(10000, 100000, 500000), repeat=3):
+    import dorm_binary
+
+    results = {}
+    for size in sizes:
+        data = make_data(size)
+        with workdir():
+            for storage in ("json", "binary"):
+                helper = DormHelper(storage=storage, verbose=False)
+                helper.set_data(copy.deepcopy(data))
+                save = load = float("inf")
+                for _ in range(repeat):
+                    helper.dirty.add("ddls")
+                    start = time.perf_counter()
+                    helper._write_snapshot()
+                    save = min(save, time.perf_counter() - start)
+                    start = time.perf_counter()
+                    helper._load_snapshot()
+                    load = min(load, time.perf_counter() - start)
+                results[f"{storage}_{size}"] = {
+                    "size_kb": os.path.getsize(helper.data_file) / 1024,
+                    "save_ms": save * 1000,
+                    "load_ms": load * 1000,
+                }
+            start = time.perf_counter()
+            dorm_binary.snapshot_summary(dorm_assistant.BINARY_DATA_FILE, "2025-06-01")
+            results[f"binary_{size}"]["summary_ms"] = (time.perf_counter() - start) * 1000
+    return results
+
+
+def bench_search(num_ddls=100000, rounds=20):
+    data = make_data(num_ddls)
+    rng = random.Random(1)
+    words = ["Final", "Exam", "Lab", "Report", "Essay", "Quiz", "Project", "Reading"]
+    for ddl in data["ddls"]:
+        ddl["title"] = f"{rng.choice(words)} {rng.choice(words)} {ddl['id']}"
+    index = dorm_assistant.DeadlineIndex(data["ddls"])
+    queries = ["exam", "lab report", "2024-03", "quiz 123", "proj 2027"]
+    start = time.perf_counter()
+    index.search("warmup")
+    build = time.perf_counter() - start
+
+    def scan(query):
+        terms = query.casefold().split()
+        return [ddl for ddl in index if all(t in ddl["title"].casefold() or ddl["date"].startswith(t) for t in terms)]
+
+    results = {"index": {"build_ms": build * 1000}}
+    for mode, run in (("scan", scan), ("index", index.search), ("index_limit", lambda q: index.search(q, 20))):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for query in queries:
+                run(query)
+        results.setdefault(mode, {})["ms_per_query"] = (time.perf_counter() - start) * 1000 / (rounds * len(queries))
+    start = time.perf_counter()
+    for i in range(1000):
+        ddl = {"id": num_ddls + i + 1, "date": "2030-01-01", "title": f"Bench {i}"}
+        index.add(ddl)
+        index.remove(ddl)
+    results["index"]["ms_per_update"] = (time.perf_counter() - start) * 1000 / 2000
+    return results
+
+
+def bench_reminders(num_ddls=100000, updates=1000):
+    data = make_data(num_ddls)
+    today = datetime.date(2024, 1, 1)
+    scheduler = dorm_assistant.ReminderScheduler()
+    start = time.perf_counter()
+    scheduler.reset(data["ddls"], today)
+    stats = {"build_ms": (time.perf_counter() - start) * 1000, "triggers": len(scheduler.heap)}
+    start = time.perf_counter()
+    for i in range(updates):
+        ddl = {"id": num_ddls + i + 1, "date": "2030-01-01", "title": f"Bench {i}"}
+        scheduler.add(ddl, today)
+        scheduler.remove(ddl)
+    stats["ms_per_update"] = (time.perf_counter() - start) * 1000 / (2 * updates)
+    start = time.perf_counter()
+    scheduler.next_due()
+    stats["next_due_ms"] = (time.perf_counter() - start) * 1000
+    now = datetime.datetime.combine(today + datetime.timedelta(days=30), datetime.time()).timestamp()
+    start = time.perf_counter()
+    stats["fired_30_days"] = len(scheduler.pop_due(now))
+    stats["pop_30_days_ms"] = (time.perf_counter() - start) * 1000
+    return {str(num_ddls): stats}
+
+
+def bench_archive(sizes=(10000, 100000), rounds=5):
+    results = {}
+    for size in sizes:
+        with workdir():
+            write_data(make_data(size))
+            helper = DormHelper(verbose=False)
+            stats = {"full_load_ms": _mean_ms(lambda i: helper.load_data(), rounds),
+                     "full_kb": os.path.getsize(helper.data_file) / 1024}
+            start = time.perf_counter()
+            stats["archived"] = helper.archive_old(datetime.date(2026, 1, 1))
+            helper.save_data()
+            stats["migrate_ms"] = (time.perf_counter() - start) * 1000
+            stats["live_load_ms"] = _mean_ms(lambda i: helper.load_data(), rounds)
+            stats["live_kb"] = os.path.getsize(helper.data_file) / 1024
+            stats["archive_files"] = len(helper.archive.periods())
+            helper = DormHelper(verbose=False)
+            stats["history_month_ms"] = _mean_ms(lambda i: helper.archive.between("2023-03-01", "2023-03-31"), 1)
+            stats["history_cold_search_ms"] = _mean_ms(lambda i: helper.search_history("exam", 20), 1)
+            stats["history_warm_search_ms"] = _mean_ms(lambda i: helper.search_history("exam", 20), rounds)
+            stats["live_search_ms"] = _mean_ms(lambda i: helper.ddl_index.search("exam", 20), rounds)
+        results[str(size)] = stats
+    return results
+
+
+def make_history(remote, commits, num_ddls=1000, days=3 * 365):
+    _git("init", "-q", "--bare", "-b", "main", remote)
+    data = make_data(num_ddls)
+    rng = random.Random(1)
+    start = int(time.time()) - days * 86400
+    stream = io.BytesIO()
+    for i in range(commits):
+        ddl = data["ddls"][rng.randrange(num_ddls)]
+        ddl["title"] = f"{ddl['title'].rsplit(' v', 1)[0]} v{i}"
+        data["shopping"][GROCERIES[i % len(GROCERIES)]] = i % 5 + 1
+        blob = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        stamp = start + i * days * 86400 // commits
+        message = f"Update data {datetime.date.fromtimestamp(stamp).isoformat()}".encode("utf-8")
+        stream.write(b"commit refs/heads/main\n")
+        stream.write(f"committer Bench <bench@example.com> {stamp} +0000\n".encode("ascii"))
+        stream.write(b"data %d\n%s\n" % (len(message), message))
+        stream.write(b"M 100644 inline %s\ndata %d\n%s\n" % (dorm_assistant.DATA_FILE.encode("utf-8"), len(blob), blob))
+    subprocess.run(["git", "--git-dir", remote, "fast-import", "--quiet"], input=stream.getvalue(), check=True)
+    _git("--git-dir", remote, "gc", "-q")
+
+
+def _repo_kb(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names) / 1024
+
+
+def bench_history(sizes=(500, 2000), num_ddls=1000, saves=10):
+    results = {}
+    env = {"GIT_AUTHOR_NAME": "Bench", "GIT_AUTHOR_EMAIL": "bench@example.com",
+           "GIT_COMMITTER_NAME": "Bench", "GIT_COMMITTER_EMAIL": "bench@example.com"}
+    saved_env = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        for length in sizes:
+            with workdir() as tmp:
+                make_history("remote.git", length, num_ddls)
+                url = "file://" + os.path.join(tmp, "remote.git")
+                stats = {"remote_kb": _repo_kb("remote.git")}
+                for mode, args in (("full", []), ("shallow", [f"--depth={dorm_assistant.SYNC_DEPTH}"])):
+                    start = time.perf_counter()
+                    _git("clone", "-q", *args, url, mode)
+                    stats[f"clone_{mode}_ms"] = (time.perf_counter() - start) * 1000
+                    stats[f"clone_{mode}_kb"] = _repo_kb(os.path.join(mode, ".git"))
+                _git("clone", "-q", url, "writer")
+                os.chdir(os.path.join(tmp, "writer"))
+                writer = DormHelper(verbose=False)
+                for window, name in ((0, "commits_per_save"), (dorm_assistant.COMMIT_WINDOW, "commits_windowed")):
+                    writer.data["config"]["commit_window"] = window
+                    before = int(subprocess.run(["git", "rev-list", "--count", "HEAD"], capture_output=True, text=True).stdout)
+                    for i in range(saves):
+                        writer.shop_add([f"{name} {i}"])
+                        writer.save_data()
+                        writer.commit_changes()
+                    after = int(subprocess.run(["git", "rev-list", "--count", "HEAD"], capture_output=True, text=True).stdout)
+                    stats[name] = (after - before) / saves
+                    writer.push_changes()
+                for mode, depth in (("full", 0), ("shallow", dorm_assistant.SYNC_DEPTH)):
+                    os.chdir(os.path.join(tmp, mode))
+                    reader = DormHelper(verbose=False)
+                    reader.data["config"]["sync_depth"] = depth
+                    start = time.perf_counter()
+                    if reader.pull_changes():
+                        reader.merge_pulled()
+                    stats[f"pull_{mode}_ms"] = (time.perf_counter() - start) * 1000
+                os.chdir(os.path.join(tmp, "writer"))
+                start = time.perf_counter()
+                writer.squash_history()
+                stats["squash_ms"] = (time.perf_counter() - start) * 1000
+                _git("--git-dir", os.path.join(tmp, "remote.git"), "gc", "-q", "--prune=now")
+                stats["squashed_remote_kb"] = _repo_kb(os.path.join(tmp, "remote.git"))
+                os.chdir(tmp)
+                start = time.perf_counter()
+                _git("clone", "-q", url, "squashed")
+                stats["clone_squashed_ms"] = (time.perf_counter() - start) * 1000
+                stats["clone_squashed_kb"] = _repo_kb(os.path.join("squashed", ".git"))
+            results[str(length)] = stats
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    return results
+
+
+def bench_watch(sizes=(1000, 100000), checks=10000):
+    results = {}
+    for size in sizes:
+        with workdir():
+            write_data(make_data(size))
+            helper = DormHelper(verbose=False)
+            stats = {"inotify": float(helper.start_watching().inotify is not None)}
+            stats["idle_check_us"] = _mean_ms(lambda i: helper.check_external(), checks) * 1000
+            watcher, helper.watcher = helper.watcher, None
+            stats["idle_stat_check_us"] = _mean_ms(lambda i: helper.check_external(), checks) * 1000
+            helper.watcher = watcher
+            data = make_data(size)
+            for i in range(3):
+                data["ddls"][i]["title"] += " (edited elsewhere)"
+                write_data(data)
+                os.utime(dorm_assistant.DATA_FILE, ns=(time.time_ns() + i, time.time_ns() + i))
+                start = time.perf_counter()
+                changed = helper.check_external()
+                stats["partial_reload_ms"] = (time.perf_counter() - start) * 1000
+            stats["changed_sections"] = len(changed)
+            start = time.perf_counter()
+            helper.set_data(helper.load_data())
+            stats["full_reload_ms"] = (time.perf_counter() - start) * 1000
+            watcher.close()
+        results[str(size)] = stats
+    return results
+
+
+def bench_batch(num_ddls=5000, commands=2000):
+    lines = []
+    for i in range(commands):
+        lines.append(f"add 2030-01-{i % 28 + 1:02d} Imported {i}" if i % 2 else f"shop add item{i % 40}")
+    results = {}
+    for mode in ("per_command", "batch"):
+        with workdir():
+            with open(dorm_assistant.DATA_FILE, "w", encoding="utf-8") as f:
+                json.dump(make_data(num_ddls), f)
+            helper = DormHelper(verbose=False)
+            helper.bytes_written = 0
+            start = time.perf_counter()
+            if mode == "batch":
+                with contextlib.redirect_stdout(io.StringIO()):
+                    dorm_assistant.run_batch(helper, lines, sync=False)
+            else:
+                for line in lines:
+                    dorm_assistant.apply_batch_command(helper, line.split())
+                    helper.save_data()
+            elapsed = time.perf_counter() - start
+        results[mode] = {"commands_per_s": commands / elapsed, "bytes_written_kb": helper.bytes_written / 1024}
+    return results
+
+
+def _mean_ms(run, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        run(i)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def bench_ops(sizes=(100, 1000, 10000, 100000), repeat=50):
+    results = {}
+    for size in sizes:
+        with workdir():
+            write_data(make_data(size, num_items=max(50, size // 100), roster_size=max(4, min(size // 100, 200))))
+            slow = 1 if size >= 100000 else 5
+            helper = DormHelper(verbose=False)
+            stats = {"load_data_ms": _mean_ms(lambda i: helper.load_data(), slow)}
+
+            def save(i):
+                helper.dirty.add("ddls")
+                helper.save_data()
+            stats["save_data_ms"] = _mean_ms(save, slow)
+            added = []
+            stats["add_ddl_ms"] = _mean_ms(lambda i: added.append(helper.add_ddl(["2030-01-01", f"Bench {i}"])), repeat)
+            stats["search_index_build_ms"] = _mean_ms(lambda i: helper.ddl_index.search("warmup"), 1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats["list_ddls_ms"] = _mean_ms(lambda i: helper.list_ddls(["Exam", "-n", "20"]), repeat)
+                stats["list_all_ddls_ms"] = _mean_ms(lambda i: helper.list_ddls([]), slow)
+            stats["delete_ddl_ms"] = _mean_ms(lambda i: helper.delete_ddl([str(added[i]["id"])]), repeat)
+            stats["shop_add_ms"] = _mean_ms(lambda i: helper.shop_add([f"Bench {i % 10}"]), repeat)
+            stats["duty_next_ms"] = _mean_ms(lambda i: helper.duty_next(), repeat)
+            stats["file_kb"] = os.path.getsize(helper.data_file) / 1024
+        results[str(size)] = stats
+    return results
+
+
+class FakeWidget:
+    def __init__(self, *args, **kwargs):
+        self.options = kwargs
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def cget(self, name):
+        return self.options.get(name, "")
+
+
+class FakeListbox(FakeWidget):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.items = []
+
+    def _index(self, index):
+        return len(self.items) if index == "end" else index
+
+    def insert(self, index, text):
+        self.items.insert(self._index(index), text)
+
+    def delete(self, first, last=None):
+        first = self._index(first)
+        last = first if last is None else self._index(last)
+        del self.items[first:last + 1]
+
+    def size(self):
+        return len(self.items)
+
+    def curselection(self):
+        return ()
+
+
+class FakeNotebook(FakeWidget):
+    def select(self):
+        return ""
+
+
+class FakeVar:
+    def __init__(self, value=""):
+        self.value = value
+        self.callbacks = []
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+        for callback in self.callbacks:
+            callback()
+
+    def trace_add(self, mode, callback):
+        self.callbacks.append(callback)
+
+
+class FakeRoot(FakeWidget):
+    def after(self, delay, callback=None):
+        return "after#0"
+
+
+@contextlib.contextmanager
+def mocked_tk():
+    import types
+    import dorm_helper_gui
+
+    fake_tk = types.SimpleNamespace(Listbox=FakeListbox, Text=FakeWidget, Toplevel=FakeWidget, StringVar=FakeVar, BooleanVar=FakeVar,
+                                    END="end", TclError=Exception)
+    fake_ttk = types.SimpleNamespace(Frame=FakeWidget, Label=FakeWidget, Button=FakeWidget, Entry=FakeWidget, Checkbutton=FakeWidget,
+                                     Scrollbar=FakeWidget, Separator=FakeWidget, Notebook=FakeNotebook)
+    saved = dorm_helper_gui.tk, dorm_helper_gui.ttk, dorm_helper_gui.messagebox
+    dorm_helper_gui.tk, dorm_helper_gui.ttk, dorm_helper_gui.messagebox = fake_tk, fake_ttk, FakeWidget()
+    try:
+        yield FakeRoot()
+    finally:
+        dorm_helper_gui.tk, dorm_helper_gui.ttk, dorm_helper_gui.messagebox = saved
+
+
+@contextlib.contextmanager
+def gui_root():
+    import tkinter
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError:
+        with mocked_tk() as root:
+            yield root, "mocked"
+        return
+    try:
+        yield root, "tk"
+    finally:
+        root.destroy()
+
+
+def bench_gui(sizes=(100, 1000, 10000, 100000), repeat=20):
+    import dorm_helper_gui
+
+    results = {}
+    for size in sizes:
+        with workdir(), gui_root() as (root, mode):
+            write_data(make_data(size, num_items=max(50, size // 100), roster_size=max(4, min(size // 100, 200))))
+            start = time.perf_counter()
+            app = dorm_helper_gui.DormHelperGUI(root)
+            stats = {"startup_ms": (time.perf_counter() - start) * 1000, "mocked": float(mode == "mocked")}
+            helper = app.dorm_helper
+            helper.verbose = False
+
+            def edit_and_refresh(i):
+                helper.add_ddl(["2030-01-01", f"Bench {i}"])
+                app.refresh_ddl_list()
+            stats["refresh_reminder_ms"] = _mean_ms(lambda i: app.update_reminder_tab(), repeat)
+            stats["refresh_ddl_list_ms"] = _mean_ms(lambda i: app.refresh_ddl_list(), repeat)
+            stats["add_and_refresh_ddl_ms"] = _mean_ms(edit_and_refresh, repeat)
+            stats["search_first_key_ms"] = _mean_ms(lambda i: app.ddl_query.set("e"), 1)
+            stats["search_ddls_ms"] = _mean_ms(lambda i: app.ddl_query.set(["exam", "lab 2024", "quiz 3"][i % 3]), repeat)
+            stats["search_one_char_ms"] = _mean_ms(lambda i: app.ddl_query.set("eo"[i % 2]), repeat)
+            app.ddl_query.set("")
+            stats["refresh_shopping_ms"] = _mean_ms(lambda i: app.refresh_shopping_list(), repeat)
+            stats["refresh_duty_ms"] = _mean_ms(lambda i: app.update_duty_tab(), repeat)
+            stats["refresh_all_ms"] = _mean_ms(lambda i: app.refresh_all_tabs(), repeat)
+            app.sync.stop(5)
+        results[str(size)] = stats
+    return results
+
+
+def _git(*args):
+    subprocess.run(["git"] + list(args), check=True, capture_output=True)
+
+
+def bench_git(sizes=(1000, 10000), rounds=5):
+    results = {}
+    env = {"GIT_AUTHOR_NAME": "Bench", "GIT_AUTHOR_EMAIL": "bench@example.com",
+           "GIT_COMMITTER_NAME": "Bench", "GIT_COMMITTER_EMAIL": "bench@example.com"}
+    saved_env = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        for size in sizes:
+            with workdir() as tmp:
+                _git("init", "-q", "--bare", "remote.git")
+                _git("clone", "-q", "remote.git", "alice")
+                _git("clone", "-q", "remote.git", "bob")
+                os.chdir(os.path.join(tmp, "alice"))
+                write_data(make_data(size))
+                alice = DormHelper(verbose=False)
+                start = time.perf_counter()
+                alice.push_changes()
+                stats = {"initial_push_ms": (time.perf_counter() - start) * 1000}
+                os.chdir(os.path.join(tmp, "bob"))
+                start = time.perf_counter()
+                bob = DormHelper(verbose=False)
+                bob.startup_sync()
+                stats["initial_pull_ms"] = (time.perf_counter() - start) * 1000
+                push = fast_pull = merge_pull = 0.0
+                for i in range(rounds):
+                    os.chdir(os.path.join(tmp, "alice"))
+                    alice.shop_add([f"Bench {i}"])
+                    alice.save_data()
+                    start = time.perf_counter()
+                    alice.push_changes()
+                    push += time.perf_counter() - start
+                    os.chdir(os.path.join(tmp, "bob"))
+                    start = time.perf_counter()
+                    if bob.pull_changes():
+                        bob.merge_pulled()
+                    fast_pull += time.perf_counter() - start
+                    bob.add_ddl(["2030-01-01", f"Bob {i}"])
+                    bob.save_data()
+                    bob.push_changes()
+                    os.chdir(os.path.join(tmp, "alice"))
+                    alice.add_ddl(["2030-02-01", f"Alice {i}"])
+                    alice.save_data()
+                    start = time.perf_counter()
+                    if alice.pull_changes():
+                        alice.merge_pulled()
+                    merge_pull += time.perf_counter() - start
+                    alice.push_changes()
+                stats["push_ms"] = push * 1000 / rounds
+                stats["fast_forward_pull_ms"] = fast_pull * 1000 / rounds
+                stats["merge_pull_ms"] = merge_pull * 1000 / rounds
+                stats["merged_ok"] = float(len(alice.data["ddls"]) == size + 2 * rounds)
+            results[str(size)] = stats
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    return results
+
+
+def compare(old_path, new_path):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)["results"]
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)["results"]
+    for name in new:
+        for mode, stats in new[name].items():
+            before = old.get(name, {}).get(mode, {})
+            for key, value in stats.items():
+                if key in before and before[key]:
+                    print(f"{name:8} {mode:12} {key:24} {before[key]:12.3f} -> {value:12.3f} ({value / before[key]:6.2f}x)")
+
+
+BENCHMARKS = {
+    "journal": bench_journal,
+    "startup": bench_startup,
+    "hall": bench_hall,
+    "server": bench_server,
+    "storage": bench_storage,
+    "search": bench_search,
+    "batch": bench_batch,
+    "reminders": bench_reminders,
+    "archive": bench_archive,
+    "ops": bench_ops,
+    "gui": bench_gui,
+    "git": bench_git,
+    "history": bench_history,
+    "watch": bench_watch,
+}
+
+
+def main(argv):
+    import argparse
+    import inspect
+    import platform
+
+    if argv[:1] == ["generate"]:
+        parser = argparse.ArgumentParser(prog="dorm_benchmark.py generate")
+        parser.add_argument("ddls", type=int)
+        parser.add_argument("output", nargs="?", default=dorm_assistant.DATA_FILE)
+        parser.add_argument("--items", type=int, default=50)
+        parser.add_argument("--roster", type=int, default=4)
+        parser.add_argument("--seed", type=int, default=0)
+        args = parser.parse_args(argv[1:])
+        write_data(make_data(args.ddls, args.seed, args.items, args.roster), args.output)
+        return
+    if argv[:1] == ["compare"]:
+        compare(*argv[1:3])
+        return
+    parser = argparse.ArgumentParser(prog="dorm_benchmark.py")
+    parser.add_argument("names", nargs="*", help=", ".join(BENCHMARKS))
+    parser.add_argument("--sizes", type=lambda text: tuple(int(size) for size in text.split(",")))
+    parser.add_argument("--json", dest="output")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    results = {}
+    for name in args.names or list(BENCHMARKS):
+        bench = BENCHMARKS[name]
+        options = {"sizes": args.sizes} if args.sizes and "sizes" in inspect.signature(bench).parameters else {}
+        print(f"== {name}")
+        results[name] = bench(**options)
+        for mode, stats in results[name].items():
+            print(f"   {mode:10} " + "  ".join(f"{k}={v:.3f}" for k, v in stats.items()))
+    if args.output:
+        run = {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
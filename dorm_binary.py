@@ -0,0 +1,302 @@
+import sys
+import json
+import mmap
+import struct
+import datetime
+
+MAGIC = b"DORMBIN\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHH")
+SECTION = struct.Struct("<4sQQ")
+COUNT = struct.Struct("<I")
+REF = struct.Struct("<I")
+SHOP = struct.Struct("<Iq")
+CORE_KEYS = ("config", "roster", "ddls", "shopping")
+
+
+class StringTable:
+    def __init__(self):
+        self.refs = {}
+        self.encoded = []
+
+    def ref(self, text):
+        ref = self.refs.get(text)
+        if ref is None:
+            ref = self.refs[text] = len(self.encoded)
+            self.encoded.append(text.encode("utf-8"))
+        return ref
+
+    def encode(self):
+        offsets = [0]
+        for chunk in self.encoded:
+            offsets.append(offsets[-1] + len(chunk) + 1)
+        blob = b"\0".join(self.encoded) + b"\0" if self.encoded else b""
+        return COUNT.pack(len(self.encoded)) + struct.pack(f"<{len(offsets)}I", *offsets) + blob
+
+
+def _ordinal(date_str):
+    try:
+        date = datetime.date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        return None
+    if date.isoformat() != date_str:
+        return None
+    return date.toordinal()
+
+
+def _is_packable(ddl, ordinals):
+    date, ddl_id = ddl.get("date"), ddl.get("id")
+    if len(ddl) != 3 or not isinstance(date, str) or not isinstance(ddl.get("title"), str):
+        return False
+    if type(ddl_id) is not int or not 0 <= ddl_id < 2 ** 64:
+        return False
+    if date not in ordinals:
+        ordinals[date] = _ordinal(date)
+    return ordinals[date] is not None
+
+
+def encode_snapshot(data):
+    strings = StringTable()
+    ordinals = {}
+    ddls = data["ddls"]
+    packed, extras = [], []
+    for pos, ddl in enumerate(ddls):
+        (packed if _is_packable(ddl, ordinals) else extras).append(pos)
+    packed.sort(key=lambda pos: (ddls[pos]["date"], ddls[pos]["id"]))
+    order = [0] * len(ddls)
+    for stored, pos in enumerate(packed + extras):
+        order[pos] = stored
+    if packed + extras == list(range(len(ddls))):
+        order = []
+    packed = [ddls[pos] for pos in packed]
+    extras = [ddls[pos] for pos in extras]
+
+    count = len(packed)
+    ddl_bytes = [
+        COUNT.pack(count),
+        struct.pack(f"<{count}Q", *[ddl["id"] for ddl in packed]),
+        struct.pack(f"<{count}I", *[ordinals[ddl["date"]] for ddl in packed]),
+        struct.pack(f"<{count}I", *[strings.ref(ddl["title"]) for ddl in packed]),
+    ]
+    roster = data["roster"]
+    roster_bytes = COUNT.pack(len(roster)) + b"".join(REF.pack(strings.ref(name)) for name in roster)
+    shop_rows, shop_extras = [], []
+    for pos, (item, count) in enumerate(data["shopping"].items()):
+        if type(count) is int and -2 ** 63 <= count < 2 ** 63:
+            shop_rows.append(SHOP.pack(strings.ref(item), count))
+        else:
+            shop_extras.append([pos, item, count])
+    shop_bytes = [COUNT.pack(len(shop_rows))] + shop_rows
+    misc = {key: value for key, value in data.items() if key not in CORE_KEYS}
+
+    sections = [
+        (b"CONF", json.dumps(data["config"], ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+        (b"ROST", roster_bytes),
+        (b"DDLS", b"".join(ddl_bytes)),
+        (b"SHOP", b"".join(shop_bytes)),
+        (b"XDDL", json.dumps(extras, ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+        (b"ORDR", COUNT.pack(len(order)) + struct.pack(f"<{len(order)}I", *order)),
+        (b"XSHP", json.dumps(shop_extras, ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+        (b"MISC", json.dumps(misc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+        (b"STRS", strings.encode()),
+    ]
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for tag, body in sections:
+        table.append(SECTION.pack(tag, offset, len(body)))
+        offset += len(body)
+    return HEADER.pack(MAGIC, VERSION, len(sections)) + b"".join(table) + b"".join(body for _, body in sections)
+
+
+def is_binary(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class BinarySnapshot:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("Empty snapshot")
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError("Truncated snapshot")
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("Not a dorm snapshot")
+        self.sections = {}
+        for pos in range(count):
+            tag, offset, length = SECTION.unpack_from(self._map, HEADER.size + pos * SECTION.size)
+            if offset + length > len(self._map):
+                self.close()
+                raise ValueError("Truncated snapshot")
+            self.sections[tag.decode("ascii")] = (offset, length)
+        self._string_count = None
+        self._strings = None
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _json(self, tag):
+        offset, length = self.sections[tag]
+        return json.loads(self._map[offset:offset + length].decode("utf-8"))
+
+    def _blob(self):
+        offset, _ = self.sections["STRS"]
+        if self._string_count is None:
+            self._string_count = COUNT.unpack_from(self._map, offset)[0]
+        return offset + COUNT.size, offset + COUNT.size + (self._string_count + 1) * 4
+
+    def string(self, ref):
+        if self._strings is not None:
+            return self._strings[ref]
+        table, blob = self._blob()
+        start, end = struct.unpack_from("<2I", self._map, table + ref * 4)
+        return self._map[blob + start:blob + end - 1].decode("utf-8")
+
+    def load_strings(self):
+        if self._strings is None:
+            offset, length = self.sections["STRS"]
+            _, blob = self._blob()
+            strings = self._map[blob:offset + length].decode("utf-8").split("\0")[:-1]
+            if len(strings) != self._string_count:
+                strings = [self.string(ref) for ref in range(self._string_count)]
+            self._strings = strings
+        return self._strings
+
+    def config(self):
+        return self._json("CONF")
+
+    def roster(self):
+        offset, _ = self.sections["ROST"]
+        count = COUNT.unpack_from(self._map, offset)[0]
+        refs = struct.unpack_from(f"<{count}I", self._map, offset + COUNT.size)
+        return [self.string(ref) for ref in refs]
+
+    def ddl_count(self):
+        return COUNT.unpack_from(self._map, self.sections["DDLS"][0])[0]
+
+    def _ordinal_at(self, pos):
+        offset, count = self.sections["DDLS"][0] + COUNT.size, self.ddl_count()
+        return struct.unpack_from("<I", self._map, offset + count * 8 + pos * 4)[0]
+
+    def ddl(self, pos):
+        offset, count = self.sections["DDLS"][0] + COUNT.size, self.ddl_count()
+        ddl_id = struct.unpack_from("<Q", self._map, offset + pos * 8)[0]
+        title = struct.unpack_from("<I", self._map, offset + count * 12 + pos * 4)[0]
+        return {"id": ddl_id, "date": datetime.date.fromordinal(self._ordinal_at(pos)).isoformat(),
+                "title": self.string(title)}
+
+    def ddls(self):
+        offset, count = self.sections["DDLS"][0] + COUNT.size, self.ddl_count()
+        ids = struct.unpack_from(f"<{count}Q", self._map, offset)
+        ordinals = struct.unpack_from(f"<{count}I", self._map, offset + count * 8)
+        titles = struct.unpack_from(f"<{count}I", self._map, offset + count * 12)
+        dates = {ordinal: datetime.date.fromordinal(ordinal).isoformat() for ordinal in set(ordinals)}
+        strings = self.load_strings()
+        ddls = [{"id": i, "date": dates[o], "title": strings[t]} for i, o, t in zip(ids, ordinals, titles)]
+        ddls += self._json("XDDL")
+        order = self._order()
+        return list(map(ddls.__getitem__, order)) if order else ddls
+
+    def _order(self):
+        if "ORDR" not in self.sections:
+            return ()
+        offset, _ = self.sections["ORDR"]
+        count = COUNT.unpack_from(self._map, offset)[0]
+        return struct.unpack_from(f"<{count}I", self._map, offset + COUNT.size)
+
+    def upcoming(self, k, today):
+        target = datetime.date.fromisoformat(today).toordinal()
+        lo, hi = 0, self.ddl_count()
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ordinal_at(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        result = [self.ddl(pos) for pos in range(lo, min(lo + k, self.ddl_count()))]
+        extras = [ddl for ddl in self._json("XDDL") if str(ddl.get("date", "")) >= today]
+        if extras:
+            result = sorted(result + extras, key=lambda ddl: (str(ddl["date"]), str(ddl["id"])))[:k]
+        return result
+
+    def shopping(self):
+        offset, _ = self.sections["SHOP"]
+        count = COUNT.unpack_from(self._map, offset)[0]
+        items = []
+        for pos in range(count):
+            ref, value = SHOP.unpack_from(self._map, offset + COUNT.size + pos * SHOP.size)
+            items.append((self.string(ref), value))
+        if "XSHP" in self.sections:
+            for pos, item, value in self._json("XSHP"):
+                items.insert(pos, (item, value))
+        return dict(items)
+
+    def misc(self):
+        return self._json("MISC")
+
+    def to_data(self):
+        data = {"config": self.config(), "roster": self.roster(), "ddls": self.ddls(), "shopping": self.shopping()}
+        data.update(self.misc())
+        return data
+
+
+def read_snapshot(path):
+    with BinarySnapshot(path) as snapshot:
+        try:
+            return snapshot.to_data()
+        except (struct.error, IndexError, KeyError) as e:
+            raise ValueError(f"Corrupt snapshot: {e}")
+
+
+def snapshot_summary(path, today, upcoming=10):
+    with BinarySnapshot(path) as snapshot:
+        roster = snapshot.roster()
+        return {
+            "duty": roster[0] if roster else None,
+            "schedule": {"roster": roster, "duty": snapshot.misc().get("duty")},
+            "upcoming": snapshot.upcoming(upcoming, today),
+            "shopping": list(snapshot.shopping().items())[:5],
+        }
+
+
+def write_snapshot(data, path):
+    with open(path, "wb") as f:
+        f.write(encode_snapshot(data))
+
+
+def json_to_binary(src, dst):
+    with open(src, "r", encoding="utf-8") as f:
+        write_snapshot(json.load(f), dst)
+
+
+def binary_to_json(src, dst):
+    with open(dst, "w", encoding="utf-8") as f:
+        json.dump(read_snapshot(src), f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print("Usage: dorm_binary.py import DATA.json DATA.bin | export DATA.bin DATA.json")
+        sys.exit(1)
+    if sys.argv[1] == "import":
+        json_to_binary(sys.argv[2], sys.argv[3])
+    else:
+        binary_to_json(sys.argv[2], sys.argv[3])
@@ -1,7 +1,133 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+import sys
 import datetime
-from dorm_assistant import DormHelper
+import difflib
+import time
+from dorm_assistant import (DormHelper, SyncWorker, AUTOSAVE_DELAY, STATS_FILE, WATCH_INTERVAL, Metrics, timed, merge_files, load_summary,
+                            summary_upcoming, summary_duty, describe_git_failure, format_stats, start_profile, stop_profile,
+                            reminder_text)
+
+class TkScheduler:
+    def __init__(self, root):
+        self.root = root
+
+    def schedule(self, delay, callback):
+        return self.root.after(int(delay * 1000), callback)
+
+    def cancel(self, handle):
+        self.root.after_cancel(handle)
+
+DDL_VIRTUAL_THRESHOLD = 500
+DDL_SEARCH_LIMIT = 1000
+SECTION_TABS = {
+    "ddls": ("reminder", "ddls"),
+    "shopping": ("reminder", "shopping"),
+    "roster": ("reminder", "duty"),
+    "duty": ("reminder", "duty"),
+}
+
+class ListboxView:
+    def __init__(self, listbox, empty_text, format_row):
+        self.listbox = listbox
+        self.empty_text = empty_text
+        self.format_row = format_row
+        self.keys = []
+        self.texts = []
+        self.values = []
+
+    def reset(self):
+        self.listbox.delete(0, tk.END)
+        self.keys, self.texts, self.values = [], [], []
+
+    def render(self, items):
+        rows = [self.format_row(item) for item in items]
+        if not rows:
+            rows = [(None, self.empty_text, None)]
+        new_keys = [row[0] for row in rows]
+        matcher = difflib.SequenceMatcher(None, self.keys, new_keys, autojunk=False)
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == "equal":
+                for offset in range(i2 - i1):
+                    text = rows[j1 + offset][1]
+                    if self.texts[i1 + offset] != text:
+                        self.listbox.delete(i1 + offset)
+                        self.listbox.insert(i1 + offset, text)
+                continue
+            if i2 > i1:
+                self.listbox.delete(i1, i2 - 1)
+            for offset in range(j2 - j1):
+                self.listbox.insert(i1 + offset, rows[j1 + offset][1])
+        self.keys = new_keys
+        self.texts = [row[1] for row in rows]
+        self.values = [row[2] for row in rows]
+
+    def value_at(self, pos):
+        if 0 <= pos < len(self.values):
+            return self.values[pos]
+        return None
+
+class VirtualListboxView:
+    def __init__(self, listbox, scrollbar, empty_text, format_row):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.page = ListboxView(listbox, empty_text, format_row)
+        self.source = []
+        self.offset = 0
+
+    def reset(self):
+        self.page.reset()
+        self.offset = 0
+
+    def page_size(self):
+        return int(self.listbox.cget("height"))
+
+    def render(self, source):
+        self.source = source
+        total = len(source)
+        size = self.page_size()
+        self.offset = max(0, min(self.offset, total - size))
+        self.page.render(source[self.offset:self.offset + size])
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + size) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def yview(self, *args):
+        size = self.page_size()
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self.source))
+        elif args[0] == "scroll":
+            step = size if args[2] == "pages" else 1
+            self.offset += int(args[1]) * step
+        self.render(self.source)
+
+    def on_wheel(self, event):
+        self.yview("scroll", -1 if event.delta > 0 or event.num == 4 else 1, "units")
+        return "break"
+
+    def value_at(self, pos):
+        return self.page.value_at(pos)
+
+class LabelList:
+    def __init__(self, parent):
+        self.frame = ttk.Frame(parent)
+        self.labels = []
+        self.rows = []
+
+    def render(self, rows):
+        for pos, row in enumerate(rows):
+            if pos < len(self.labels):
+                if self.rows[pos] != row:
+                    self.labels[pos].config(text=row[0], **row[1])
+            else:
+                label = ttk.Label(self.frame, text=row[0], **row[1])
+                label.pack(anchor="w")
+                self.labels.append(label)
+        for label in self.labels[len(rows):]:
+            label.destroy()
+        del self.labels[len(rows):]
+        self.rows = list(rows)
 
 class DormHelperGUI:
     def __init__(self, root):
@@ -11,17 +137,78 @@ class DormHelperGUI:
         self.root.option_add("*Font", "SimHei 10")
         self.root.encoding = "utf-8"
 
-        self.dorm_helper = DormHelper()
-        self.dorm_helper.startup_sync()
+        self.metrics = Metrics()
+        self.profiler = None
+        self.dorm_helper = None
+        start = time.perf_counter()
         self.init_ui()
+        self.render_reminder(load_summary())
+        self.root.update()
+        self.metrics.record("first_paint", (time.perf_counter() - start) * 1000)
+        if "--exit-after-paint" in sys.argv[1:]:
+            print("painted", flush=True)
+        with self.metrics.timer("finish_startup"):
+            self.finish_startup()
+
+    def finish_startup(self):
+        self.dorm_helper = DormHelper(autosave_delay=AUTOSAVE_DELAY, scheduler=TkScheduler(self.root), metrics=self.metrics,
+                                      warm_search=True)
+        self.dorm_helper.archive_old()
+        self.init_data_tabs()
+        self.update_reminder_tab()
+        self.notify_sync = False
+        self.sync = SyncWorker(self.dorm_helper)
+        self.sync.pull()
+        self.root.after(100, self.poll_sync)
+        self.reminder_job = None
+        self.dorm_helper.enable_reminders(on_change=self.schedule_reminders)
+        self.dorm_helper.start_watching()
+        self.root.after(int(WATCH_INTERVAL * 1000), self.watch_files)
+
+    def watch_files(self):
+        if not self.dorm_helper.sync_pending:
+            changed = self.dorm_helper.check_external()
+            if changed:
+                self.refresh_sections(changed)
+                self.sync_status.config(text="Reloaded changes from disk")
+        self.root.after(int(WATCH_INTERVAL * 1000), self.watch_files)
+
+    def schedule_reminders(self):
+        if self.reminder_job is not None:
+            self.root.after_cancel(self.reminder_job)
+            self.reminder_job = None
+        delay = self.dorm_helper.reminders.delay()
+        if delay is not None:
+            self.reminder_job = self.root.after(int(delay * 1000) + 1, self.fire_reminders)
+
+    def fire_reminders(self):
+        self.reminder_job = None
+        due = self.dorm_helper.reminders.pop_due()
+        if due:
+            self.root.bell()
+            messagebox.showinfo("Reminder", "\n".join(reminder_text(ddl, lead) for ddl, lead in due))
+        self.schedule_reminders()
 
     def init_ui(self):
         self.tab_control = ttk.Notebook(self.root)
         
         self.tab_reminder = ttk.Frame(self.tab_control)
         self.tab_control.add(self.tab_reminder, text="Daily Reminder")
-        self.update_reminder_tab()
+        self.init_reminder_tab()
         
+        self.tab_control.pack(expand=1, fill="both", padx=10, pady=10)
+        
+        self.bottom_frame = ttk.Frame(self.root)
+        self.bottom_frame.pack(fill="x", padx=10, pady=5)
+        
+        ttk.Button(self.bottom_frame, text="Sync Data", command=self.sync_data).pack(side="left", padx=5)
+        ttk.Button(self.bottom_frame, text="Save Data", command=self.save_data).pack(side="left", padx=5)
+        ttk.Button(self.bottom_frame, text="Help", command=self.show_help).pack(side="left", padx=5)
+        ttk.Button(self.bottom_frame, text="Exit", command=self.quit_app).pack(side="right", padx=5)
+        self.sync_status = ttk.Label(self.bottom_frame, text="")
+        self.sync_status.pack(side="left", padx=10)
+
+    def init_data_tabs(self):
         self.tab_ddl = ttk.Frame(self.tab_control)
         self.tab_control.add(self.tab_ddl, text="Deadlines")
         self.init_ddl_tab()
@@ -32,50 +219,63 @@ class DormHelperGUI:
         
         self.tab_duty = ttk.Frame(self.tab_control)
         self.tab_control.add(self.tab_duty, text="Duty Roster")
-        self.update_duty_tab()
-        
-        self.tab_control.pack(expand=1, fill="both", padx=10, pady=10)
+        self.init_duty_tab()
         
-        self.bottom_frame = ttk.Frame(self.root)
-        self.bottom_frame.pack(fill="x", padx=10, pady=5)
-        
-        ttk.Button(self.bottom_frame, text="Sync Data", command=self.sync_data).pack(side="left", padx=5)
-        ttk.Button(self.bottom_frame, text="Save Data", command=self.save_data).pack(side="left", padx=5)
-        ttk.Button(self.bottom_frame, text="Help", command=self.show_help).pack(side="left", padx=5)
-        ttk.Button(self.bottom_frame, text="Exit", command=self.quit_app).pack(side="right", padx=5)
+        self.tab_diagnostics = ttk.Frame(self.tab_control)
+        self.tab_control.add(self.tab_diagnostics, text="Diagnostics")
+        self.init_diagnostics_tab()
 
-    def update_reminder_tab(self):
-        for widget in self.tab_reminder.winfo_children():
-            widget.destroy()
-        
-        today_str = datetime.date.today().isoformat()
+    def init_reminder_tab(self):
         frame = ttk.Frame(self.tab_reminder)
         frame.pack(padx=10, pady=10, fill="both", expand=True)
         
-        ttk.Label(frame, text=f"Dormitory Helper | {today_str}", font=("SimHei", 14, "bold")).pack(anchor="w", pady=5)
+        self.reminder_title = ttk.Label(frame, font=("SimHei", 14, "bold"))
+        self.reminder_title.pack(anchor="w", pady=5)
         ttk.Separator(frame, orient="horizontal").pack(fill="x", pady=5)
         
         reminder_frame = ttk.Frame(frame)
         reminder_frame.pack(anchor="w", pady=10)
         
-        current_duty = self.dorm_helper.data['roster'][0] if self.dorm_helper.data['roster'] else "None"
-        ttk.Label(reminder_frame, text=f"🧹 Today's Duty: {current_duty}", font=("SimHei", 12)).pack(anchor="w", pady=3)
+        self.reminder_duty = ttk.Label(reminder_frame, font=("SimHei", 12))
+        self.reminder_duty.pack(anchor="w", pady=3)
         
         ttk.Label(reminder_frame, text="📅 Upcoming Deadlines (Top 3):", font=("SimHei", 12, "bold")).pack(anchor="w", pady=5)
-        sorted_ddls = sorted(self.dorm_helper.data['ddls'], key=lambda x: x['date'])
-        if not sorted_ddls:
-            ttk.Label(reminder_frame, text="   No deadlines", font=("SimHei", 11)).pack(anchor="w")
-        else:
-            for task in sorted_ddls[:3]:
-                ttk.Label(reminder_frame, text=f"   - {task['date']} : {task['title']}", font=("SimHei", 11)).pack(anchor="w")
+        self.reminder_ddls = LabelList(reminder_frame)
+        self.reminder_ddls.frame.pack(anchor="w")
 
         ttk.Label(reminder_frame, text="🛒 Shopping List (Top 5):", font=("SimHei", 12, "bold")).pack(anchor="w", pady=5)
-        shopping_data = self.dorm_helper.data['shopping']
-        if not shopping_data:
-            ttk.Label(reminder_frame, text="   No items", font=("SimHei", 11)).pack(anchor="w")
+        self.reminder_shopping = LabelList(reminder_frame)
+        self.reminder_shopping.frame.pack(anchor="w")
+
+    def update_reminder_tab(self):
+        self.render_reminder(self.dorm_helper.summary())
+
+    @timed("refresh_reminder")
+    def render_reminder(self, summary):
+        today_str = datetime.date.today().isoformat()
+        self.reminder_title.config(text=f"Dormitory Helper | {today_str}")
+        
+        item_style = {"font": ("SimHei", 11)}
+        upcoming = summary_upcoming(summary, today_str) if summary else None
+        if upcoming is None:
+            self.reminder_duty.config(text="🧹 Today's Duty: ...")
+            self.reminder_ddls.render([("   Loading...", item_style)])
+            self.reminder_shopping.render([("   Loading...", item_style)])
+            return
+        
+        current_duty = summary_duty(summary, today_str) or "None"
+        self.reminder_duty.config(text=f"🧹 Today's Duty: {current_duty}")
+        
+        if not upcoming:
+            self.reminder_ddls.render([("   No deadlines", item_style)])
         else:
-            for idx, (item, count) in enumerate(list(shopping_data.items())[:5], 1):
-                ttk.Label(reminder_frame, text=f"   - {item} x {count}", font=("SimHei", 11)).pack(anchor="w")
+            self.reminder_ddls.render([(f"   - {task['date']} : {task['title']}", item_style) for task in upcoming])
+
+        top_items = summary['shopping']
+        if not top_items:
+            self.reminder_shopping.render([("   No items", item_style)])
+        else:
+            self.reminder_shopping.render([(f"   - {item} x {count}", item_style) for item, count in top_items])
 
     def init_ddl_tab(self):
         input_frame = ttk.Frame(self.tab_ddl)
@@ -92,8 +292,30 @@ class DormHelperGUI:
         
         ttk.Button(input_frame, text="Add", command=self.add_ddl).pack(side="left", padx=5)
         
-        self.ddl_listbox = tk.Listbox(self.tab_ddl, width=90, height=18, font=("SimHei", 10))
-        self.ddl_listbox.pack(padx=10, pady=5, fill="both", expand=True)
+        search_frame = ttk.Frame(self.tab_ddl)
+        search_frame.pack(fill="x", padx=10)
+        ttk.Label(search_frame, text="Search:").pack(side="left", padx=5)
+        self.ddl_query = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.ddl_query, width=40).pack(side="left", padx=5)
+        self.ddl_query.trace_add("write", self.search_ddls)
+        self.ddl_history = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_frame, text="Include archived", variable=self.ddl_history,
+                        command=self.search_ddls).pack(side="left", padx=5)
+        self.ddl_matches = ttk.Label(search_frame, text="")
+        self.ddl_matches.pack(side="left", padx=5)
+        
+        list_frame = ttk.Frame(self.tab_ddl)
+        list_frame.pack(padx=10, pady=5, fill="both", expand=True)
+        self.ddl_listbox = tk.Listbox(list_frame, width=90, height=18, font=("SimHei", 10))
+        self.ddl_scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
+        self.ddl_scrollbar.pack(side="right", fill="y")
+        self.ddl_listbox.pack(side="left", fill="both", expand=True)
+        
+        format_ddl = lambda ddl: (id(ddl), f"{ddl['date']} | {ddl['title']}"
+                                  + (" (archived)" if self.dorm_helper.is_archived(ddl) else ""), ddl)
+        self.ddl_full_view = ListboxView(self.ddl_listbox, "No deadlines", format_ddl)
+        self.ddl_virtual_view = VirtualListboxView(self.ddl_listbox, self.ddl_scrollbar, "No deadlines", format_ddl)
+        self.ddl_view = None
         
         btn_frame = ttk.Frame(self.tab_ddl)
         btn_frame.pack(fill="x", padx=10, pady=5)
@@ -120,26 +342,56 @@ class DormHelperGUI:
         self.ddl_date.insert(0, datetime.date.today().isoformat())
         self.refresh_ddl_list()
 
-    def refresh_ddl_list(self):
-        self.ddl_listbox.delete(0, tk.END)
-        sorted_ddls = sorted(self.dorm_helper.data['ddls'], key=lambda x: x['date'])
-        if not sorted_ddls:
-            self.ddl_listbox.insert(tk.END, "No deadlines")
+    def set_ddl_view(self, view):
+        if view is self.ddl_view:
             return
-        for idx, ddl in enumerate(sorted_ddls, 1):
-            self.ddl_listbox.insert(tk.END, f"[{idx}] {ddl['date']} | {ddl['title']}")
+        if self.ddl_view is not None:
+            self.ddl_view.reset()
+        self.ddl_view = view
+        if view is self.ddl_virtual_view:
+            self.ddl_listbox.config(yscrollcommand="")
+            self.ddl_scrollbar.config(command=view.yview)
+            self.ddl_listbox.bind("<MouseWheel>", view.on_wheel)
+            self.ddl_listbox.bind("<Button-4>", view.on_wheel)
+            self.ddl_listbox.bind("<Button-5>", view.on_wheel)
+        else:
+            self.ddl_listbox.config(yscrollcommand=self.ddl_scrollbar.set)
+            self.ddl_scrollbar.config(command=self.ddl_listbox.yview)
+            for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                self.ddl_listbox.unbind(sequence)
+
+    def search_ddls(self, *args):
+        self.ddl_virtual_view.offset = 0
+        self.refresh_ddl_list()
+
+    @timed("refresh_ddl_list")
+    def refresh_ddl_list(self):
+        ddl_index = self.dorm_helper.ddl_index
+        query = self.ddl_query.get()
+        if self.ddl_history.get():
+            ddls = self.dorm_helper.search_history(query, DDL_SEARCH_LIMIT)
+        else:
+            ddls = ddl_index.search(query, DDL_SEARCH_LIMIT) if query.strip() else ddl_index
+        limited = len(ddls) >= DDL_SEARCH_LIMIT and ddls is not ddl_index
+        self.ddl_matches.config(text=f"First {DDL_SEARCH_LIMIT} matches" if limited else "")
+        if len(ddls) > DDL_VIRTUAL_THRESHOLD:
+            self.set_ddl_view(self.ddl_virtual_view)
+        else:
+            self.set_ddl_view(self.ddl_full_view)
+        self.ddl_view.render(ddls)
 
     def delete_ddl(self):
         selected = self.ddl_listbox.curselection()
         if not selected:
             return
-        idx = selected[0]
-        sorted_ddls = sorted(self.dorm_helper.data['ddls'], key=lambda x: x['date'])
-        if not sorted_ddls: return 
+        ddl = self.ddl_view.value_at(selected[0])
+        if ddl is None:
+            return
+        if self.dorm_helper.is_archived(ddl):
+            messagebox.showinfo("Archived", "Archived deadlines are read-only")
+            return
         
-        ddl_id = sorted_ddls[idx]['id']
-        original_idx = next(i for i, d in enumerate(self.dorm_helper.data['ddls']) if d['id'] == ddl_id)
-        self.dorm_helper.data['ddls'].pop(original_idx)
+        self.dorm_helper.remove_ddl(ddl)
         self.refresh_ddl_list()
 
     def init_shopping_tab(self):
@@ -154,6 +406,7 @@ class DormHelperGUI:
         
         self.shop_listbox = tk.Listbox(self.tab_shopping, width=90, height=18, font=("SimHei", 10))
         self.shop_listbox.pack(padx=10, pady=5, fill="both", expand=True)
+        self.shop_view = ListboxView(self.shop_listbox, "List is empty", lambda entry: (entry[0], f"{entry[0]} x {entry[1]}", entry[0]))
         
         btn_frame = ttk.Frame(self.tab_shopping)
         btn_frame.pack(fill="x", padx=10, pady=5)
@@ -171,29 +424,20 @@ class DormHelperGUI:
         self.shop_item.delete(0, tk.END)
         self.refresh_shopping_list()
 
+    @timed("refresh_shopping_list")
     def refresh_shopping_list(self):
-        self.shop_listbox.delete(0, tk.END)
         shopping_data = self.dorm_helper.data['shopping']
-        if not shopping_data:
-            self.shop_listbox.insert(tk.END, "List is empty")
-            return
-        
-        sorted_items = sorted(shopping_data.items(), key=lambda x: x[0])
-        for idx, (item_name, count) in enumerate(sorted_items, 1):
-            self.shop_listbox.insert(tk.END, f"[{idx}] {item_name} x {count}")
+        self.shop_view.render(sorted(shopping_data.items(), key=lambda x: x[0]))
 
     def delete_shopping_item(self):
         selected = self.shop_listbox.curselection()
         if not selected:
             return
-        idx = selected[0]
-        shopping_data = self.dorm_helper.data['shopping']
-        if "List is empty" in self.shop_listbox.get(0):
+        item_name = self.shop_view.value_at(selected[0])
+        if item_name is None:
             return
         
-        item_line = self.shop_listbox.get(idx)
-        item_name = item_line.split(" x ")[0].split("] ")[1]
-        del shopping_data[item_name]
+        self.dorm_helper.shop_remove(item_name)
         self.refresh_shopping_list()
 
     def clear_shopping_list(self):
@@ -204,10 +448,7 @@ class DormHelperGUI:
             self.dorm_helper.shop_clear()
             self.refresh_shopping_list()
 
-    def update_duty_tab(self):
-        for widget in self.tab_duty.winfo_children():
-            widget.destroy()
-        
+    def init_duty_tab(self):
         frame = ttk.Frame(self.tab_duty)
         frame.pack(padx=10, pady=10, fill="both", expand=True)
         
@@ -217,33 +458,51 @@ class DormHelperGUI:
         duty_frame = ttk.Frame(frame)
         duty_frame.pack(anchor="w", pady=10)
         
-        duty_list = self.dorm_helper.data['roster']
-        current_duty = duty_list[0] if duty_list else "None"
-        
         ttk.Label(duty_frame, text=f"Today's Duty:", font=("SimHei", 12)).pack(anchor="w", pady=3)
-        ttk.Label(duty_frame, text=f"   {current_duty}", font=("SimHei", 14, "bold"), foreground="red").pack(anchor="w", pady=2)
+        self.duty_current = ttk.Label(duty_frame, font=("SimHei", 14, "bold"), foreground="red")
+        self.duty_current.pack(anchor="w", pady=2)
         
         ttk.Button(duty_frame, text="Rotate to Next", command=self.rotate_duty, width=15).pack(anchor="w", pady=8)
         
         ttk.Label(duty_frame, text="Full Rotation Order:", font=("SimHei", 12, "bold")).pack(anchor="w", pady=5)
-        if not duty_list:
-            ttk.Label(duty_frame, text="   No duty personnel", font=("SimHei", 11)).pack(anchor="w")
-        else:
-            for idx, person in enumerate(duty_list, 1):
-                if person == current_duty:
-                    ttk.Label(duty_frame, text=f"   [{idx}] {person} (Current)", font=("SimHei", 11, "bold"), foreground="red").pack(anchor="w")
-                else:
-                    ttk.Label(duty_frame, text=f"   [{idx}] {person}", font=("SimHei", 11)).pack(anchor="w")
+        self.duty_order = LabelList(duty_frame)
+        self.duty_order.frame.pack(anchor="w")
+        
+        ttk.Label(duty_frame, text="Coming Up:", font=("SimHei", 12, "bold")).pack(anchor="w", pady=5)
+        self.duty_upcoming = LabelList(duty_frame)
+        self.duty_upcoming.frame.pack(anchor="w")
 
         ttk.Button(frame, text="Edit Duty Personnel", command=self.edit_duty_roster).pack(anchor="w", padx=10, pady=10)
+        self.update_duty_tab()
+
+    @timed("refresh_duty_tab")
+    def update_duty_tab(self):
+        duty_list = self.dorm_helper.data['roster']
+        current_duty = self.dorm_helper.duty.on_duty() or "None"
+        self.duty_current.config(text=f"   {current_duty}")
+        
+        if not duty_list:
+            self.duty_order.render([("   No duty personnel", {"font": ("SimHei", 11)})])
+            self.duty_upcoming.render([])
+            return
+        self.duty_upcoming.render([
+            (f"   {start} : {person or '(Skipped)'}", {"font": ("SimHei", 11)})
+            for start, person in self.dorm_helper.duty.upcoming(4)[1:]
+        ])
+        rows = []
+        for idx, person in enumerate(duty_list, 1):
+            if person == current_duty:
+                rows.append((f"   [{idx}] {person} (Current)", {"font": ("SimHei", 11, "bold"), "foreground": "red"}))
+            else:
+                rows.append((f"   [{idx}] {person}", {"font": ("SimHei", 11), "foreground": ""}))
+        self.duty_order.render(rows)
 
     def rotate_duty(self):
         duty_list = self.dorm_helper.data['roster']
         if len(duty_list) < 2:
             messagebox.showwarning("Warning", "At least 2 people required to rotate")
             return
-        current = duty_list.pop(0)
-        duty_list.append(current)
+        self.dorm_helper.duty_next()
         self.update_duty_tab()
         self.update_reminder_tab()
 
@@ -269,7 +528,7 @@ class DormHelperGUI:
                 messagebox.showwarning("Error", "List cannot be empty", parent=edit_win)
                 return
             
-            self.dorm_helper.data['roster'] = new_roster
+            self.dorm_helper.set_roster(new_roster)
             self.update_duty_tab()
             self.update_reminder_tab()
             edit_win.destroy()
@@ -279,29 +538,97 @@ class DormHelperGUI:
         ttk.Button(btn_frame, text="OK", command=save_roster).pack(side="left", padx=10)
         ttk.Button(btn_frame, text="Cancel", command=edit_win.destroy).pack(side="left", padx=10)
 
+    def init_diagnostics_tab(self):
+        self.diag_listbox = tk.Listbox(self.tab_diagnostics, width=90, height=16, font=("Courier", 9))
+        self.diag_listbox.pack(padx=10, pady=5, fill="both", expand=True)
+        self.diag_view = ListboxView(self.diag_listbox, "No data yet", lambda line: (line, line, None))
+        
+        ttk.Label(self.tab_diagnostics, text="Recent git commands:", font=("SimHei", 10, "bold")).pack(anchor="w", padx=10)
+        self.diag_git = tk.Listbox(self.tab_diagnostics, width=90, height=6, font=("Courier", 9))
+        self.diag_git.pack(padx=10, pady=5, fill="x")
+        self.diag_git_view = ListboxView(self.diag_git, "No git commands yet", lambda line: (line, line, None))
+        
+        btn_frame = ttk.Frame(self.tab_diagnostics)
+        btn_frame.pack(fill="x", padx=10, pady=5)
+        ttk.Button(btn_frame, text="Refresh", command=self.refresh_diagnostics).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="Export JSON", command=lambda: self.export_stats(STATS_FILE)).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="Export CSV", command=lambda: self.export_stats(STATS_FILE.replace(".json", ".csv"))).pack(side="left", padx=5)
+        self.tab_control.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.refresh_diagnostics()
+
+    def on_tab_changed(self, event):
+        if self.tab_control.select() == str(self.tab_diagnostics):
+            self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        self.diag_view.render(format_stats(self.metrics))
+        calls = self.metrics.snapshot()["git_calls"]
+        self.diag_git_view.render([
+            f"git {' '.join(call['args'])[:40]:40} exit {call['code']:>3} {call['ms']:>8.1f} ms {call['error']}"
+            for call in reversed(calls)
+        ])
+
+    def export_stats(self, path):
+        self.metrics.export(path)
+        messagebox.showinfo("Exported", f"Stats written to {path}")
+
+    def poll_sync(self):
+        for state, job, ok in self.sync.poll():
+            if state == "started":
+                self.sync_status.config(text="Pulling..." if job == "pull" else "Pushing...")
+                continue
+            if job == "pull":
+                if ok:
+                    self.refresh_sections(self.dorm_helper.changed_sections)
+                failure = "" if ok else describe_git_failure(self.sync.last_failure)
+                self.sync_status.config(text="Synced" if ok else f"Offline mode ({failure})")
+                if self.notify_sync:
+                    self.notify_sync = False
+                    if ok:
+                        messagebox.showinfo("Success", "Data synced")
+                    else:
+                        messagebox.showerror("Failed", f"Sync failed. Check network or git setup.\n\n{failure}")
+            else:
+                self.sync_status.config(text="Pushed" if ok else "Saved locally (push failed)")
+        self.root.after(100, self.poll_sync)
+
     def sync_data(self):
-        if self.dorm_helper._git_command(['pull', '--rebase']):
-            self.dorm_helper.data = self.load_data()
-            self.refresh_all_tabs()
-            messagebox.showinfo("Success", "Data synced")
-        else:
-            messagebox.showerror("Failed", "Sync failed. Check network or git setup.")
+        self.notify_sync = True
+        self.sync.pull()
 
     def save_data(self):
-        self.dorm_helper.save_data()
-        self.dorm_helper.shutdown_sync()
-        messagebox.showinfo("Success", "Data saved and synced")
+        if self.sync.save():
+            messagebox.showinfo("Success", "Data saved, syncing in background")
+        else:
+            self.sync_status.config(text="Saving after sync...")
 
     def show_help(self):
-        help_text = "Dormitory Helper Guide:\n\n1. Duty: Click Rotate to switch. Edit to change names.\n2. Shopping: Add items. Duplicates increase count.\n3. Deadlines: Add dates (YYYY-MM-DD).\n4. Data saves automatically on exit."
+        help_text = "Dormitory Helper Guide:\n\n1. Duty: Click Rotate to switch. Edit to change names.\n2. Shopping: Add items. Duplicates increase count.\n3. Deadlines: Add dates (YYYY-MM-DD).\n4. Changes save automatically a moment after you stop editing."
         messagebox.showinfo("Help", help_text)
 
     def quit_app(self):
         if messagebox.askyesno("Exit", "Exit Dormitory Helper?"):
-            self.dorm_helper.save_data()
-            self.dorm_helper.shutdown_sync()
+            self.sync.save()
+            self.root.withdraw()
+            self.dorm_helper.watcher.close()
+            if self.reminder_job is not None:
+                self.root.after_cancel(self.reminder_job)
+            self.sync.stop()
+            if self.profiler:
+                stop_profile(self.profiler)
             self.root.destroy()
 
+    def refresh_sections(self, sections):
+        tabs = {tab for section in sections for tab in SECTION_TABS.get(section, ())}
+        if "reminder" in tabs:
+            self.update_reminder_tab()
+        if "ddls" in tabs:
+            self.refresh_ddl_list()
+        if "shopping" in tabs:
+            self.refresh_shopping_list()
+        if "duty" in tabs:
+            self.update_duty_tab()
+
     def refresh_all_tabs(self):
         self.update_reminder_tab()
         self.refresh_ddl_list()
@@ -312,6 +639,14 @@ class DormHelperGUI:
         return self.dorm_helper.load_data()
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "merge-driver":
+        sys.exit(merge_files(*sys.argv[2:5]))
+    profiler = start_profile() if "--profile" in sys.argv[1:] else None
     root = tk.Tk()
     app = DormHelperGUI(root)
-    root.mainloop()
\ No newline at end of file
+    app.profiler = profiler
+    if "--exit-after-paint" in sys.argv[1:]:
+        print("loaded", flush=True)
+        root.destroy()
+    else:
+        root.mainloop()
\ No newline at end of file
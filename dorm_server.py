@@ -0,0 +1,343 @@
+import sys
+import json
+import asyncio
+import argparse
+import datetime
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from dorm_assistant import DormHelper, AUTOSAVE_DELAY
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_BODY = 1024 * 1024
+CACHE_SIZE = 128
+
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncioScheduler:
+    def __init__(self, server):
+        self.server = server
+
+    def schedule(self, delay, callback):
+        loop = asyncio.get_running_loop()
+        return loop.call_later(delay, lambda: loop.create_task(self.server.run_locked(callback)))
+
+    def cancel(self, handle):
+        handle.cancel()
+
+
+def _valid_date(value):
+    try:
+        datetime.datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise HttpError(400, "Date format error. Use YYYY-MM-DD")
+    return value
+
+
+def _field(body, name):
+    value = body.get(name)
+    if not isinstance(value, str) or not value.strip():
+        raise HttpError(400, f"Missing field: {name}")
+    return value.strip()
+
+
+class DormServer:
+    def __init__(self, journal=False, data_file=None, storage="json"):
+        self.write_lock = asyncio.Lock()
+        self.cache = OrderedDict()
+        self.cache_day = None
+        self.stats = {"requests": 0, "cache_hits": 0}
+        options = {"data_file": data_file} if data_file else {}
+        self.helper = DormHelper(journal=journal, autosave_delay=AUTOSAVE_DELAY,
+                                 scheduler=AsyncioScheduler(self), verbose=False, storage=storage, **options)
+        self.routes = [
+            ("GET", ("today",), self.get_today, ("roster", "duty", "ddls", "shopping")),
+            ("GET", ("ddls",), self.get_ddls, ("ddls",)),
+            ("GET", ("ddls", "upcoming"), self.get_upcoming, ("ddls",)),
+            ("GET", ("ddls", "{}"), self.get_ddl, ("ddls",)),
+            ("POST", ("ddls",), self.post_ddl, ("ddls",)),
+            ("PUT", ("ddls", "{}"), self.put_ddl, ("ddls",)),
+            ("DELETE", ("ddls", "{}"), self.delete_ddl, ("ddls",)),
+            ("GET", ("shopping",), self.get_shopping, ("shopping",)),
+            ("POST", ("shopping",), self.post_shopping, ("shopping",)),
+            ("DELETE", ("shopping",), self.clear_shopping, ("shopping",)),
+            ("DELETE", ("shopping", "{}"), self.delete_shopping, ("shopping",)),
+            ("GET", ("duty",), self.get_duty, ("roster", "duty")),
+            ("PUT", ("duty",), self.put_duty, ("roster", "duty")),
+            ("POST", ("duty", "next"), self.post_duty_next, ("roster", "duty")),
+            ("POST", ("duty", "skip"), self.post_duty_skip, ("roster", "duty")),
+            ("POST", ("duty", "swap"), self.post_duty_swap, ("roster", "duty")),
+            ("POST", ("save",), self.post_save, ()),
+        ]
+
+    async def start(self, host=HOST, port=PORT):
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def run_locked(self, callback):
+        async with self.write_lock:
+            await asyncio.get_running_loop().run_in_executor(None, callback)
+
+    def match(self, method, parts):
+        allowed = False
+        for route_method, pattern, handler, sections in self.routes:
+            if len(pattern) != len(parts):
+                continue
+            if any(p != "{}" and p != part for p, part in zip(pattern, parts)):
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            args = [part for p, part in zip(pattern, parts) if p == "{}"]
+            return handler, args, sections
+        raise HttpError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+
+    async def dispatch(self, method, target, body):
+        self.stats["requests"] += 1
+        try:
+            url = urlsplit(target)
+            parts = tuple(unquote(part) for part in url.path.strip("/").split("/") if part)
+            handler, args, sections = self.match(method, parts)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if method == "GET":
+                today = datetime.date.today()
+                if today != self.cache_day:
+                    self.cache.clear()
+                    self.cache_day = today
+                key = (url.path, url.query)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.cache.move_to_end(key)
+                    self.stats["cache_hits"] += 1
+                    return cached[1]
+                result = self.encode(*handler(args, query, None))
+                if result[0] == 200:
+                    self.cache[key] = (sections, result)
+                    if len(self.cache) > CACHE_SIZE:
+                        self.cache.popitem(last=False)
+                return result
+            try:
+                payload = json.loads(body) if body else {}
+            except json.JSONDecodeError:
+                raise HttpError(400, "Invalid JSON body")
+            if not isinstance(payload, dict):
+                raise HttpError(400, "JSON body must be an object")
+            async with self.write_lock:
+                with self.helper.lock:
+                    result = handler(args, query, payload)
+                self.invalidate(sections)
+            if handler == self.post_save:
+                await self.run_locked(self.helper.save_data)
+            return self.encode(*result)
+        except HttpError as e:
+            return self.encode(e.status, {"error": str(e)})
+        except Exception as e:
+            return self.encode(500, {"error": str(e)})
+
+    def invalidate(self, sections):
+        for key in [key for key, (cached_sections, _) in self.cache.items() if set(cached_sections) & set(sections)]:
+            del self.cache[key]
+
+    def encode(self, status, payload):
+        return status, json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    def response(self, status, body, keep_alive):
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'OK')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        return head.encode("latin-1") + body
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    writer.write(self.response(400, b'{"error": "Bad request line"}', False))
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version != "HTTP/1.0" or connection == "keep-alive")
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY:
+                    writer.write(self.response(413, b'{"error": "Invalid body length"}', False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.dispatch(method.upper(), target, body)
+                writer.write(self.response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def get_today(self, args, query, body):
+        today = datetime.date.today().isoformat()
+        summary = self.helper.summary(today)
+        del summary["schedule"]
+        summary["upcoming"] = summary["upcoming"][:3]
+        summary["date"] = today
+        return 200, summary
+
+    def get_ddls(self, args, query, body):
+        index = self.helper.ddl_index
+        try:
+            limit = max(int(query.get("limit", 0)), 0)
+        except ValueError:
+            raise HttpError(400, "limit must be a number")
+        q = query.get("q", "")
+        if query.get("history") in ("1", "true"):
+            ddls = self.helper.search_history(q, limit or None)
+        elif "from" in query or "to" in query:
+            start, end = query.get("from", ""), query.get("to", "9999-12-31")
+            if q:
+                ddls = [ddl for ddl in index.search(q) if start <= ddl["date"] <= end + "\uffff"]
+            else:
+                ddls = index.between(start, end)
+        else:
+            ddls = index.search(q, limit)
+        return 200, ddls[:limit] if limit else ddls
+
+    def get_upcoming(self, args, query, body):
+        try:
+            k = int(query.get("k", 3))
+        except ValueError:
+            raise HttpError(400, "k must be a number")
+        return 200, self.helper.ddl_index.upcoming(k, query.get("from"))
+
+    def _ddl(self, ddl_id):
+        try:
+            ddl = self.helper.get_ddl(int(ddl_id))
+        except ValueError:
+            ddl = None
+        if ddl is None:
+            raise HttpError(404, "ID does not exist")
+        return ddl
+
+    def get_ddl(self, args, query, body):
+        return 200, self._ddl(args[0])
+
+    def post_ddl(self, args, query, body):
+        date = _valid_date(body.get("date"))
+        ddl = self.helper.add_ddl([date, _field(body, "title")])
+        return 201, ddl
+
+    def put_ddl(self, args, query, body):
+        ddl = self._ddl(args[0])
+        date = _valid_date(body.get("date", ddl["date"]))
+        title = _field(body, "title") if "title" in body else ddl["title"]
+        return 200, self.helper.edit_ddl([str(ddl["id"]), date, title])
+
+    def delete_ddl(self, args, query, body):
+        ddl = self._ddl(args[0])
+        self.helper.remove_ddl(ddl)
+        return 200, ddl
+
+    def get_shopping(self, args, query, body):
+        return 200, self.helper.data["shopping"]
+
+    def post_shopping(self, args, query, body):
+        item = _field(body, "item")
+        return 201, {"item": item, "count": self.helper.shop_add([item])}
+
+    def clear_shopping(self, args, query, body):
+        self.helper.shop_clear()
+        return 200, {}
+
+    def delete_shopping(self, args, query, body):
+        if not self.helper.shop_remove(args[0]):
+            raise HttpError(404, "Item does not exist")
+        return 200, {"item": args[0]}
+
+    def get_duty(self, args, query, body):
+        try:
+            weeks = int(query.get("weeks", 4))
+        except ValueError:
+            raise HttpError(400, "weeks must be a number")
+        weeks = max(0, min(weeks, 520))
+        duty = self.helper.duty
+        upcoming = [{"from": start, "person": person} for start, person in duty.upcoming(weeks)]
+        return 200, {"current": duty.on_duty(), "roster": self.helper.data["roster"], "upcoming": upcoming}
+
+    def put_duty(self, args, query, body):
+        roster = body.get("roster")
+        if not isinstance(roster, list) or not all(isinstance(name, str) and name.strip() for name in roster) or not roster:
+            raise HttpError(400, "roster must be a non-empty list of names")
+        self.helper.set_roster([name.strip() for name in roster])
+        return self.get_duty(args, query, body)
+
+    def post_duty_next(self, args, query, body):
+        if len(self.helper.data["roster"]) < 2:
+            raise HttpError(400, "Need at least 2 people to rotate")
+        self.helper.duty_next()
+        return self.get_duty(args, query, body)
+
+    def post_duty_skip(self, args, query, body):
+        self.helper.duty_skip([_valid_date(body.get("date"))])
+        return self.get_duty(args, query, body)
+
+    def post_duty_swap(self, args, query, body):
+        self.helper.duty_swap([_valid_date(body.get("a")), _valid_date(body.get("b"))])
+        return self.get_duty(args, query, body)
+
+    def post_save(self, args, query, body):
+        return 200, {"saved": True}
+
+
+async def serve(host=HOST, port=PORT, journal=False, storage="json"):
+    server = DormServer(journal=journal, storage=storage)
+    listener = await server.start(host, port)
+    print(f"Dorm Helper API on http://{host}:{listener.sockets[0].getsockname()[1]}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.helper.save_data()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="dorm_assistant.py serve")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--journal", action="store_true")
+    parser.add_argument("--binary", action="store_true")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.journal, "binary" if args.binary else "json"))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
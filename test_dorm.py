@@ -0,0 +1,555 @@
+import json
+import time
+import shutil
+import subprocess
+
+import pytest
+
+import dorm_assistant
+import dorm_binary
+from dorm_assistant import DormHelper, OperationJournal, merge_data, merge_files
+
+
+def make_data(ddls=(), shopping=None, offset=0):
+    return {
+        "config": {"next_ddl_id": max([ddl["id"] for ddl in ddls if isinstance(ddl["id"], int)] + [0]) + 1},
+        "roster": ["Alice", "Bob", "Carol"],
+        "ddls": [dict(ddl) for ddl in ddls],
+        "shopping": dict(shopping or {}),
+        "duty": {"anchor": "2024-01-01", "period": 7, "offset": offset, "overrides": {}},
+    }
+
+
+def test_merge_renumbers_concurrent_id_collisions():
+    shared = {"id": 1, "date": "2024-05-01", "title": "Shared"}
+    base = make_data([shared])
+    ours = make_data([shared, {"id": 2, "date": "2024-06-01", "title": "Ours"}])
+    theirs = make_data([shared, {"id": 2, "date": "2024-06-02", "title": "Theirs"}])
+    merged = merge_data(base, ours, theirs)
+    titles = {ddl["title"]: ddl["id"] for ddl in merged["ddls"]}
+    assert set(titles) == {"Shared", "Ours", "Theirs"}
+    assert len(set(titles.values())) == 3
+    assert titles["Theirs"] == 2
+
+
+def test_merge_keeps_one_side_edits_and_deletes():
+    a = {"id": 1, "date": "2024-05-01", "title": "Exam"}
+    b = {"id": 2, "date": "2024-05-02", "title": "Lab"}
+    base = make_data([a, b])
+    ours = make_data([dict(a, title="Exam moved"), b])
+    theirs = make_data([a])
+    merged = merge_data(base, ours, theirs)
+    assert merged["ddls"] == [dict(a, title="Exam moved")]
+
+
+def test_merge_adds_shopping_counters():
+    base = make_data(shopping={"milk": 1, "tea": 2})
+    ours = make_data(shopping={"milk": 3, "tea": 2})
+    theirs = make_data(shopping={"milk": 2, "eggs": 1})
+    merged = merge_data(base, ours, theirs)
+    assert merged["shopping"] == {"milk": 4, "eggs": 1}
+
+
+def test_merge_adds_duty_offsets():
+    base = make_data(offset=1)
+    ours = make_data(offset=2)
+    theirs = make_data(offset=4)
+    ours["duty"]["overrides"] = {"2024-02-01": "Bob"}
+    merged = merge_data(base, ours, theirs)
+    assert merged["duty"]["offset"] == 5
+    assert merged["duty"]["overrides"] == {"2024-02-01": "Bob"}
+
+
+def test_merge_files_writes_merged_json(tmp_path):
+    paths = []
+    for name, shopping in (("base", {}), ("ours", {"milk": 1}), ("theirs", {"eggs": 1})):
+        path = tmp_path / name
+        path.write_text(json.dumps(make_data(shopping=shopping)), encoding="utf-8")
+        paths.append(str(path))
+    assert merge_files(*paths) == 0
+    with open(paths[1], encoding="utf-8") as f:
+        assert json.load(f)["shopping"] == {"eggs": 1, "milk": 1}
+
+
+def test_journal_replay(tmp_path):
+    journal = OperationJournal(str(tmp_path / "data.journal"))
+    journal.append({"op": "add_ddl", "ddl": {"id": 1, "date": "2024-05-01", "title": "Exam"}})
+    journal.append({"op": "shop_add", "item": "milk"})
+    journal.append({"op": "shop_add", "item": "milk"})
+    journal.append({"op": "duty_next"})
+    data = OperationJournal(journal.path).replay(make_data())
+    assert data["ddls"] == [{"id": 1, "date": "2024-05-01", "title": "Exam"}]
+    assert data["shopping"] == {"milk": 2}
+    assert data["duty"]["offset"] == 1
+    assert data["config"]["next_ddl_id"] == 2
+
+
+def test_journal_replay_skips_ops_in_snapshot(tmp_path):
+    journal = OperationJournal(str(tmp_path / "data.journal"))
+    journal.append({"op": "shop_add", "item": "milk"})
+    data = make_data(shopping={"milk": 1})
+    data["config"]["journal_seq"] = journal.marker()
+    journal.append({"op": "shop_add", "item": "milk"})
+    assert OperationJournal(journal.path).replay(data)["shopping"] == {"milk": 2}
+
+
+def test_journal_replay_truncates_torn_tail(tmp_path):
+    journal = OperationJournal(str(tmp_path / "data.journal"))
+    journal.append({"op": "shop_add", "item": "milk"})
+    journal.append({"op": "shop_add", "item": "eggs"})
+    good = journal.size()
+    with open(journal.path, "ab") as f:
+        f.write(b'{"op":"shop_add","item":"br')
+
+    journal = OperationJournal(journal.path)
+    assert journal.replay(make_data())["shopping"] == {"milk": 1, "eggs": 1}
+    assert journal.size() == good
+
+    journal.append({"op": "shop_add", "item": "tea"})
+    data = OperationJournal(journal.path).replay(make_data())
+    assert data["shopping"] == {"milk": 1, "eggs": 1, "tea": 1}
+
+
+def test_binary_round_trip(tmp_path):
+    data = make_data([
+        {"id": 3, "date": "2024-09-01", "title": "Thesis"},
+        {"id": 1, "date": "2024-05-01", "title": "Exam"},
+        {"id": "x", "date": "someday", "title": "Odd one"},
+        {"id": 2, "date": "2024-01-03", "title": "Lab"},
+    ], shopping={"milk": 2, "tea": 1.5, "eggs": 3, "rice": 2 ** 70})
+    data["config"]["archive_after_days"] = 30
+    path = str(tmp_path / "data.bin")
+    dorm_binary.write_snapshot(data, path)
+    loaded = dorm_binary.read_snapshot(path)
+    assert loaded == data
+    assert loaded["ddls"] == data["ddls"]
+    assert list(loaded["shopping"]) == list(data["shopping"])
+    upcoming = dorm_binary.snapshot_summary(path, "2024-04-01")["upcoming"]
+    assert [ddl["id"] for ddl in upcoming] == [1, 3, "x"]
+
+
+def test_binary_round_trip_through_json(tmp_path):
+    data = make_data([{"id": 1, "date": "2024-05-01", "title": "Exam"}], shopping={"milk": 1})
+    src, binary, dst = (str(tmp_path / name) for name in ("a.json", "a.bin", "b.json"))
+    with open(src, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    dorm_binary.json_to_binary(src, binary)
+    dorm_binary.binary_to_json(binary, dst)
+    with open(dst, encoding="utf-8") as f:
+        assert json.load(f) == data
+
+
+def git(*args, cwd):
+    subprocess.run(["git"] + list(args), cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    for key, value in (("NAME", "Dorm Test"), ("EMAIL", "dorm@example.com")):
+        monkeypatch.setenv(f"GIT_AUTHOR_{key}", value)
+        monkeypatch.setenv(f"GIT_COMMITTER_{key}", value)
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    git("init", "-q", "--bare", "remote.git", cwd=tmp_path)
+    git("clone", "-q", "remote.git", "alice", cwd=tmp_path)
+    monkeypatch.chdir(tmp_path / "alice")
+    helper = DormHelper(verbose=False)
+    helper.save_data()
+    assert helper.push_changes()
+    git("clone", "-q", "remote.git", "bob", cwd=tmp_path)
+    return tmp_path
+
+
+def pull(helper):
+    assert helper.pull_changes()
+    helper.merge_pulled()
+
+
+def test_sync_merges_both_roommates(remote, monkeypatch):
+    monkeypatch.chdir(remote / "bob")
+    bob = DormHelper(verbose=False)
+    bob.add_ddl(["2030-01-01", "Bob task"])
+    bob.shop_add(["milk"])
+    bob.save_data()
+    assert bob.push_changes()
+
+    monkeypatch.chdir(remote / "alice")
+    alice = DormHelper(verbose=False)
+    alice.add_ddl(["2030-01-02", "Alice task"])
+    alice.shop_add(["milk"])
+    alice.duty_next()
+    alice.save_data()
+    pull(alice)
+    assert sorted(ddl["title"] for ddl in alice.data["ddls"]) == ["Alice task", "Bob task"]
+    assert len({ddl["id"] for ddl in alice.data["ddls"]}) == 2
+    assert alice.data["shopping"] == {"milk": 2}
+    alice.save_data()
+    assert alice.push_changes()
+
+    monkeypatch.chdir(remote / "bob")
+    pull(bob)
+    assert sorted(ddl["title"] for ddl in bob.data["ddls"]) == ["Alice task", "Bob task"]
+    assert bob.data["shopping"] == {"milk": 2}
+    assert bob.data["duty"]["offset"] == 1
+
+
+def test_sync_worker_defers_autosave_until_merged(remote, monkeypatch):
+    monkeypatch.chdir(remote / "bob")
+    bob = DormHelper(verbose=False)
+    bob.add_ddl(["2030-01-01", "Bob task"])
+    bob.save_data()
+    assert bob.push_changes()
+
+    monkeypatch.chdir(remote / "alice")
+    alice = DormHelper(verbose=False, autosave_delay=0.05)
+    sync = dorm_assistant.SyncWorker(alice)
+    try:
+        sync.pull()
+        alice.shop_add(["milk"])
+        done = []
+        for _ in range(200):
+            time.sleep(0.05)
+            with alice.lock:
+                done += [event for event in sync.poll() if event[0] == "done"]
+            if done:
+                break
+        assert done == [("done", "pull", True)]
+        time.sleep(0.2)
+    finally:
+        sync.stop(10)
+    assert alice.sync_pending == 0
+    with open(alice.data_file, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert [ddl["title"] for ddl in saved["ddls"]] == ["Bob task"]
+    assert saved["shopping"] == {"milk": 1}
+
+
+def test_reload_external_renumbers_unsaved_deadline(tmp_path):
+    helper = DormHelper(data_file=str(tmp_path / "data.json"), verbose=False)
+    for i in range(40):
+        helper.add_ddl([f"2030-01-{i % 28 + 1:02d}", f"Task {i}"])
+    helper.save_data()
+    mine = helper.add_ddl(["2030-02-01", "Alice report"])
+    with open(helper.data_file, encoding="utf-8") as f:
+        data = json.load(f)
+    data["ddls"].append({"id": mine["id"], "date": "2030-02-02", "title": "Bob errand"})
+    data["config"]["next_ddl_id"] = mine["id"] + 1
+    time.sleep(0.01)
+    with open(helper.data_file, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+    assert "ddls" in helper.reload_external()
+    ids = [ddl["id"] for ddl in helper.data["ddls"]]
+    assert len(ids) == len(set(ids)) == 42
+    assert [ddl["title"] for ddl in helper.ddl_index.search("alice")] == ["Alice report"]
+    assert [ddl["title"] for ddl in helper.ddl_index.search("bob")] == ["Bob errand"]
+    for ddl in helper.data["ddls"]:
+        assert helper.get_ddl(ddl["id"]) is ddl
+        assert not helper.is_archived(ddl)
+    assert list(helper.ddl_index) == sorted(helper.data["ddls"], key=lambda ddl: (ddl["date"], ddl["id"]))
+
+
+def test_reload_external_keeps_unsaved_edits(tmp_path):
+    helper = DormHelper(data_file=str(tmp_path / "data.json"), verbose=False)
+    helper.add_ddl(["2030-01-01", "Exam"])
+    helper.save_data()
+    kept = helper.data["ddls"][0]
+    helper.shop_add(["milk"])
+    with open(helper.data_file, encoding="utf-8") as f:
+        data = json.load(f)
+    data["shopping"]["eggs"] = 1
+    time.sleep(0.01)
+    with open(helper.data_file, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+    assert helper.reload_external() == {"shopping"}
+    assert helper.data["shopping"] == {"eggs": 1, "milk": 1}
+    assert helper.data["ddls"][0] is kept
+    helper.save_data()
+    with open(helper.data_file, encoding="utf-8") as f:
+        assert json.load(f)["shopping"] == {"eggs": 1, "milk": 1}
+
+
+def test_reminders_fire_in_time_order():
+    today = dorm_assistant.datetime.date(2030, 1, 1)
+    exam = {"id": 1, "date": "2030-01-08", "title": "Exam"}
+    lab = {"id": 2, "date": "2030-01-02", "title": "Lab"}
+    reminders = dorm_assistant.ReminderScheduler(leads=(7, 1, 0), hour=9)
+    reminders.reset([exam, lab], today=today)
+    at = lambda day, hour: dorm_assistant.datetime.datetime(2030, 1, day, hour).timestamp()
+    assert reminders.pop_due(at(1, 8)) == []
+    assert reminders.pop_due(at(1, 9)) == [(exam, 7), (lab, 1)]
+    assert reminders.delay(at(1, 10)) == 3600
+    reminders.remove(lab)
+    assert reminders.pop_due(at(2, 12)) == []
+    assert reminders.pop_due(at(8, 12)) == [(exam, 1), (exam, 0)]
+    assert reminders.next_due() is None
+
+
+def test_reminders_do_not_repeat_after_reset(tmp_path):
+    helper = DormHelper(data_file=str(tmp_path / "data.json"), verbose=False)
+    today = dorm_assistant.datetime.date.today()
+    for days, title in ((0, "Today"), (1, "Tomorrow")):
+        helper.add_ddl([(today + dorm_assistant.datetime.timedelta(days=days)).isoformat(), title])
+    reminders = helper.enable_reminders()
+    tonight = dorm_assistant.datetime.datetime.combine(today, dorm_assistant.datetime.time(23, 59)).timestamp()
+    assert sorted(ddl["title"] for ddl, _ in reminders.pop_due(tonight)) == ["Today", "Tomorrow"]
+
+    helper.set_data(helper.data)
+    assert helper.reminders.pop_due(tonight) == []
+    helper.set_reminder_leads(["7", "1", "0"])
+    assert helper.reminders.pop_due(tonight) == []
+    helper.edit_ddl([str(helper.data["ddls"][0]["id"]), today.isoformat(), "Today", "again"])
+    assert helper.reminders.pop_due(tonight) == []
+    tomorrow = tonight + 24 * 3600
+    assert [(ddl["title"], lead) for ddl, lead in helper.reminders.pop_due(tomorrow)] == [("Tomorrow", 0)]
+
+
+def naive_search(ddls, query, limit=None):
+    terms = query.casefold().split()
+    found = [ddl for ddl in sorted(ddls, key=lambda ddl: (ddl["date"], ddl["id"]))
+             if all(term in ddl["title"].casefold() or ddl["date"].startswith(term) for term in terms)]
+    return found[:limit] if limit else found
+
+
+def test_search_matches_a_full_scan():
+    titles = ["Exam", "exam review", "Lab report", "Quiz 3", "EXAMPLE", "Lab 2", "Laundry", "Rent"]
+    ddls = [{"id": i, "date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "title": f"{titles[i % len(titles)]} {i}"}
+            for i in range(1, 400)]
+    index = dorm_assistant.DeadlineIndex(ddls)
+    for query in ["e", "ex", "exa", "exam", "EXAM re", "lab 2", "2024-03", "2024-03 lab", "3", "la 1", "zz", "xyz"]:
+        for limit in (None, 1, 5, 1000):
+            assert index.search(query, limit) == naive_search(ddls, query, limit), (query, limit)
+
+
+def test_search_follows_index_updates():
+    index = dorm_assistant.DeadlineIndex([{"id": 1, "date": "2024-05-01", "title": "Exam"}])
+    assert [ddl["id"] for ddl in index.search("exam")] == [1]
+    lab = {"id": 2, "date": "2024-04-01", "title": "Exam lab"}
+    index.add(lab)
+    assert [ddl["id"] for ddl in index.search("exam")] == [2, 1]
+    assert index.search("exam", 1) == [lab]
+    index.remove(lab)
+    assert [ddl["id"] for ddl in index.search("ex")] == [1]
+    assert index.search("lab") == []
+
+
+def test_search_index_warms_in_background():
+    ddls = [{"id": i, "date": "2024-05-01", "title": f"Task {i}"} for i in range(1, 2000)]
+    index = dorm_assistant.DeadlineIndex(ddls)
+    index.warm()
+    for _ in range(100):
+        if index._titles is not None:
+            break
+        time.sleep(0.02)
+    assert index._titles is not None
+    assert [ddl["id"] for ddl in index.search("task 1999")] == [1999]
+
+
+def test_duty_schedule_projects_by_date():
+    data = make_data()
+    duty = dorm_assistant.DutySchedule(data)
+    assert [duty.on_duty(day) for day in ("2024-01-01", "2024-01-07", "2024-01-08", "2024-01-22", "2023-12-31")] == \
+        ["Alice", "Alice", "Bob", "Alice", "Carol"]
+    data["duty"]["offset"] = 1
+    assert duty.upcoming(3, "2024-01-03") == [("2024-01-01", "Bob"), ("2024-01-08", "Carol"), ("2024-01-15", "Alice")]
+
+
+def test_duty_skip_swap_and_next(tmp_path):
+    helper = DormHelper(data_file=str(tmp_path / "data.json"), verbose=False)
+    helper.set_roster(["Alice", "Bob", "Carol"])
+    helper.data["duty"] = make_data()["duty"]
+    helper.duty = dorm_assistant.DutySchedule(helper.data)
+
+    assert helper.duty_skip(["2024-01-10"])
+    assert helper.duty.on_duty("2024-01-08") is None
+    assert helper.duty_swap(["2024-01-15", "2024-01-22"])
+    assert helper.duty.upcoming(3, "2024-01-08") == [("2024-01-08", None), ("2024-01-15", "Alice"), ("2024-01-22", "Carol")]
+    assert helper.duty_swap(["2024-01-15", "2024-01-22"])
+    assert helper.data["duty"]["overrides"] == {"2024-01-08": None}
+    assert helper.duty_next()
+    assert helper.data["roster"] == ["Alice", "Bob", "Carol"]
+    assert helper.duty.on_duty("2024-01-01") == "Bob"
+
+
+def test_merge_keeps_one_sided_roster_order():
+    base, ours, theirs = make_data(), make_data(), make_data()
+    for data, rotations in ((base, 3), (ours, 3), (theirs, 4)):
+        data["config"]["rotations"] = rotations
+    ours["roster"] = ["Carol", "Alice", "Bob"]
+    theirs["duty"]["offset"] = 1
+    merged = merge_data(base, ours, theirs)
+    assert merged["roster"] == ["Carol", "Alice", "Bob"]
+    assert merged["duty"]["offset"] == 1
+
+
+def wait_for(sync, helper, job):
+    done = []
+    for _ in range(200):
+        time.sleep(0.05)
+        with helper.lock:
+            done += [event for event in sync.poll() if event[0] == "done"]
+        if ("done", job, True) in done:
+            return done
+    return done
+
+
+def test_manual_save_waits_for_pending_pull(remote, monkeypatch):
+    monkeypatch.chdir(remote / "bob")
+    bob = DormHelper(verbose=False)
+    bob.add_ddl(["2030-01-01", "Bob task"])
+    bob.save_data()
+    assert bob.push_changes()
+
+    monkeypatch.chdir(remote / "alice")
+    alice = DormHelper(verbose=False)
+    sync = dorm_assistant.SyncWorker(alice)
+    try:
+        sync.pull()
+        alice.add_ddl(["2030-01-02", "Alice task"])
+        with alice.lock:
+            assert not sync.save()
+        assert wait_for(sync, alice, "push") == [("done", "pull", True), ("done", "push", True)]
+    finally:
+        sync.stop(10)
+    monkeypatch.chdir(remote / "bob")
+    pull(bob)
+    assert sorted(ddl["title"] for ddl in bob.data["ddls"]) == ["Alice task", "Bob task"]
+
+
+def test_quit_saves_after_pending_pull(remote, monkeypatch):
+    monkeypatch.chdir(remote / "alice")
+    alice = DormHelper(verbose=False)
+    sync = dorm_assistant.SyncWorker(alice)
+    sync.pull()
+    alice.shop_add(["milk"])
+    with alice.lock:
+        sync.save()
+        events = sync.stop(10)
+    assert [event for event in events if event[0] == "done"] == [("done", "pull", True), ("done", "push", True)]
+    monkeypatch.chdir(remote / "bob")
+    bob = DormHelper(verbose=False)
+    pull(bob)
+    assert bob.data["shopping"] == {"milk": 1}
+
+
+def test_deadline_index_orders_by_date_then_id():
+    ddls = [{"id": i, "date": date, "title": f"Task {i}"}
+            for i, date in enumerate(["2024-06-02", "2024-05-01", "2024-06-02", "2024-04-30", "2024-07-01"], 1)]
+    index = dorm_assistant.DeadlineIndex(ddls)
+    assert [ddl["id"] for ddl in index] == [4, 2, 1, 3, 5]
+    assert [ddl["id"] for ddl in index.upcoming(2, "2024-05-01")] == [2, 1]
+    assert [ddl["id"] for ddl in index.upcoming(10, "2024-08-01")] == []
+    assert [ddl["id"] for ddl in index.between("2024-05-01", "2024-06")] == [2, 1, 3]
+    assert [ddl["id"] for ddl in index.between("2024-06-02", "2024-06-02")] == [1, 3]
+
+    index.add({"id": 6, "date": "2024-06-02", "title": "Task 6"})
+    assert [ddl["id"] for ddl in index.between("2024-06", "2024-06")] == [1, 3, 6]
+    assert not index.remove(dict(index.get(3)))
+    assert index.remove(index.get(3))
+    assert [ddl["id"] for ddl in index] == [4, 2, 1, 6, 5]
+    assert index.get(3) is None and len(index) == 5
+
+
+def test_deadline_ids_are_never_reused(tmp_path):
+    helper = DormHelper(data_file=str(tmp_path / "data.json"), verbose=False)
+    first, second, third = (helper.add_ddl(["2030-01-01", title]) for title in ("A", "B", "C"))
+    assert [first["id"], second["id"], third["id"]] == [first["id"], first["id"] + 1, first["id"] + 2]
+    helper.delete_ddl([str(second["id"])])
+    assert [ddl["title"] for ddl in helper.data["ddls"]][-2:] == ["A", "C"]
+    assert helper.get_ddl(second["id"]) is None
+    fourth = helper.add_ddl(["2030-01-01", "D"])
+    assert fourth["id"] == third["id"] + 1
+    helper.delete_ddl([str(first["id"])])
+    assert [ddl["title"] for ddl in helper.data["ddls"]][-2:] == ["C", "D"]
+    assert all(helper.get_ddl(ddl["id"]) is ddl for ddl in helper.data["ddls"])
+
+
+def test_load_migrates_duplicate_deadline_ids(tmp_path):
+    path = tmp_path / "data.json"
+    data = make_data([{"id": 1, "date": "2024-05-01", "title": "A"}])
+    data["ddls"] += [{"id": 1, "date": "2024-05-02", "title": "B"}, {"id": "7", "date": "2024-05-03", "title": "C"}]
+    data["config"] = {"last_opened": "2024-05-01"}
+    path.write_text(json.dumps(data), encoding="utf-8")
+    helper = DormHelper(data_file=str(path), verbose=False)
+    assert [(ddl["id"], ddl["title"]) for ddl in helper.data["ddls"]] == [(1, "A"), (2, "B"), (3, "C")]
+    assert helper.data["config"]["next_ddl_id"] == 4
+    assert helper.add_ddl(["2030-01-01", "D"])["id"] == 4
+
+
+def test_batch_rolls_back_on_a_bad_line(tmp_path, capsys):
+    path = tmp_path / "data.json"
+    helper = DormHelper(data_file=str(path), verbose=False)
+    helper.add_ddl(["2030-01-01", "Exam"])
+    helper.save_data()
+    before, on_disk = json.loads(json.dumps(helper.data)), path.read_text(encoding="utf-8")
+    lines = ["add 2030-02-01 Lab", "shop add milk", "duty next", "delete 999999", "add 2030-03-01 Never"]
+    assert not dorm_assistant.run_batch(helper, lines, sync=False)
+    assert "Line 4" in capsys.readouterr().out
+    assert helper.data == before
+    assert path.read_text(encoding="utf-8") == on_disk
+    assert [ddl["title"] for ddl in helper.ddl_index.search("lab")] == []
+    assert helper.get_ddl(before["config"]["next_ddl_id"]) is None
+
+
+def test_batch_applies_and_saves_once(tmp_path):
+    path = tmp_path / "data.json"
+    helper = DormHelper(data_file=str(path), verbose=False, journal=True)
+    lines = ["# weekly chores", "add 2030-02-01 Lab", "", "shop add milk", "shop add milk", "duty next"]
+    assert dorm_assistant.run_batch(helper, lines, sync=False)
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert [ddl["title"] for ddl in saved["ddls"]] == ["Lab"]
+    assert saved["shopping"] == {"milk": 2}
+    assert saved["duty"]["offset"] == 1
+    assert helper.journal.size() == 0
+
+
+def test_archive_splits_old_deadlines_by_month(tmp_path):
+    helper = DormHelper(data_file=str(tmp_path / "data.json"), verbose=False)
+    for date, title in (("2024-01-05", "Old exam"), ("2024-01-20", "Old lab"), ("2024-02-10", "Exam retake"),
+                        ("2024-03-25", "Exam"), ("2024-04-02", "Lab")):
+        helper.add_ddl([date, title])
+    helper.data["ddls"].append({"id": 99, "date": "someday", "title": "Odd"})
+    helper.set_data(helper.data)
+    assert helper.archive_old(dorm_assistant.datetime.date(2024, 4, 1)) == 3
+    assert sorted(ddl["title"] for ddl in helper.data["ddls"]) == ["Exam", "Lab", "Odd"]
+    assert helper.archive.periods() == ["2024-01", "2024-02"]
+    with open(helper.archive.file("2024-01"), encoding="utf-8") as f:
+        assert [ddl["title"] for ddl in json.load(f)] == ["Old exam", "Old lab"]
+    assert helper.archive_old(dorm_assistant.datetime.date(2024, 4, 1)) == 0
+
+    archived = dorm_assistant.DeadlineArchive(helper.archive.path)
+    assert [ddl["title"] for ddl in archived.between("2024-02-01", "2024-02-28")] == ["Exam retake"]
+    assert archived.loaded() == ["2024-02"]
+
+
+def test_history_search_merges_archive_and_live(tmp_path):
+    helper = DormHelper(data_file=str(tmp_path / "data.json"), verbose=False)
+    for date, title in (("2024-01-05", "Exam one"), ("2024-02-10", "Lab"), ("2024-03-25", "Exam two"),
+                        ("2024-04-02", "Exam three")):
+        helper.add_ddl([date, title])
+    helper.archive_old(dorm_assistant.datetime.date(2024, 3, 20))
+    live = helper.data["ddls"]
+    assert [ddl["title"] for ddl in helper.ddl_index.search("exam")] == ["Exam two", "Exam three"]
+    found = helper.search_history("exam")
+    assert [ddl["title"] for ddl in found] == ["Exam one", "Exam two", "Exam three"]
+    assert [helper.is_archived(ddl) for ddl in found] == [True, False, False]
+    assert [ddl["title"] for ddl in helper.search_history("exam", 2)] == ["Exam one", "Exam two"]
+    assert [ddl["title"] for ddl in helper.search_history("2024-02")] == ["Lab"]
+    assert all(not helper.is_archived(ddl) for ddl in live)
+
+
+def test_merge_takes_the_changed_side_as_is():
+    a = {"id": 1, "date": "2024-05-01", "title": "Exam"}
+    b = {"id": 2, "date": "2024-05-02", "title": "Lab"}
+    base = make_data([a, b], shopping={"milk": 1})
+    ours = make_data([b, dict(a, title="Exam moved"), {"id": 3, "date": "2024-05-03", "title": "New"}],
+                     shopping={"milk": 1})
+    theirs = make_data([a, b], shopping={"milk": 2, "tea": 1})
+    merged = merge_data(base, ours, theirs)
+    assert merged["ddls"] == ours["ddls"]
+    assert merged["shopping"] == {"milk": 2, "tea": 1}
+    assert merge_data(base, theirs, ours)["ddls"] == ours["ddls"]